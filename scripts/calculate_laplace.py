@@ -14,7 +14,13 @@ from scientific_computing.laplace import (
     gauss_seidel,
     optimal_omega,
 )
+from scientific_computing.cache import cached
 
+# Load results from the cache when they were computed before
+sor = cached(sor)
+jacobi_iteration = cached(jacobi_iteration)
+gauss_seidel = cached(gauss_seidel)
+optimal_omega = cached(optimal_omega)
 
 eps = 0.00001
 width = 50
@@ -50,7 +56,7 @@ list_N = [20, 30, 40, 50, 60, 70, 80]
 list_omega = []
 
 for N in list_N:
-    omega = optimal_omega(N, eps)
+    omega = optimal_omega(N, eps, search="golden")
     list_omega.append(omega)
 
 np.save("data/list_omega_laplace.npy", list_omega)
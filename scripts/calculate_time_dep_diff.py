@@ -8,15 +8,22 @@ File description:
 """
 
 import numpy as np
-from scientific_computing.time_dep_diff import time_dep_diff, analytical_solution
+from scientific_computing.time_dep_diff import (
+    time_dep_diff_snapshots,
+    analytical_solution,
+)
+from scientific_computing.cache import cached
+
+# Load results from the cache when they were computed before
+time_dep_diff_snapshots = cached(time_dep_diff_snapshots)
 
 width = 50
 D = 1
 dt = 0.0001
 
 times = [0, 0.001, 0.01, 0.1, 1]
-for time in times:
-    grid = time_dep_diff(width, D, dt, time)
+snapshots = time_dep_diff_snapshots(width, D, dt, times)
+for time, grid in zip(times, snapshots):
     np.save(f"data/time_dep_diff_{time}", grid)
 
     # At t=0 it is not possible to calculate analytical solution
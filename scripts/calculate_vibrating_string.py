@@ -7,12 +7,14 @@ File description:
     Solves the vibrating string and stores the data.
 """
 
-from scientific_computing.vibrating_string import (
-    solve_vibrating_string,
-    animate_string,
-)
+from scientific_computing.vibrating_string import solve_vibrating_string
+from scientific_computing.plotting import animate_string
+from scientific_computing.cache import cached
 import numpy as np
 
+# Load results from the cache when they were computed before
+solve_vibrating_string = cached(solve_vibrating_string)
+
 h = 0.01
 dt = h
 dx = h
@@ -10,6 +10,11 @@ File description:
 from scientific_computing.add_object_SOR import create_objects, sor_with_objects
 import numpy as np
 from scientific_computing.laplace import sor
+from scientific_computing.cache import cached
+
+# Load results from the cache when they were computed before
+sor = cached(sor)
+sor_with_objects = cached(sor_with_objects)
 
 # Define three different (sets of) objects
 list_objects1 = np.array([[3, 8, 4, 10]], dtype=np.int64)
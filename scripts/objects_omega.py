@@ -8,10 +8,11 @@ File description:
 """
 
 import numpy as np
-from scientific_computing.add_object_SOR import (
-    calculate_optimal_omega,
-    calculate_optimal_omega_objects,
-)
+from scientific_computing.sweep import parallel_optimal_omega
+from scientific_computing.cache import cached
+
+# Load results from the cache when they were computed before
+parallel_optimal_omega = cached(parallel_optimal_omega)
 
 # Define two different (sets of) objects
 list_objects1 = np.array([[3, 8, 4, 10]], dtype=np.int64)
@@ -23,10 +24,12 @@ list_N = np.array([20, 30, 40, 50, 60, 70, 80], dtype=np.int64)
 
 eps = 0.00001
 
-list_omega_object1 = calculate_optimal_omega_objects(eps, list_objects1, list_N)
-list_omega_object2 = calculate_optimal_omega_objects(eps, list_objects2, list_N)
-list_omega = calculate_optimal_omega(eps, list_N)
+# The sweep runs in a pool of processes, which needs the main guard
+if __name__ == "__main__":
+    list_omega_object1, list_omega_object2, list_omega = parallel_optimal_omega(
+        eps, list_N, [list_objects1, list_objects2, None], "golden"
+    )
 
-np.save("data/list_omega.npy", list_omega)
-np.save("data/list_omega_object1.npy", list_omega_object1)
-np.save("data/list_omega_object2.npy", list_omega_object2)
+    np.save("data/list_omega.npy", list_omega)
+    np.save("data/list_omega_object1.npy", list_omega_object1)
+    np.save("data/list_omega_object2.npy", list_omega_object2)
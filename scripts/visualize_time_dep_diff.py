@@ -12,7 +12,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.lines import Line2D
 from matplotlib.animation import FuncAnimation
-from scientific_computing.time_dep_diff import time_dep_diff
+from scientific_computing.time_dep_diff import time_dep_diff_snapshots
 
 
 def visualize_comparison(width):
@@ -102,9 +102,12 @@ def animation(width, D, dt, total_time):
     plt.xticks(fontsize=16)
     plt.yticks(fontsize=16)
 
+    # Compute all frames in a single pass
+    times = [(i / 50) * total_time for i in range(50)]
+    grids = time_dep_diff_snapshots(width, D, dt, times)
+
     # Initial grid
-    grid = time_dep_diff(width, D, dt, 0)
-    im = ax.imshow(grid, origin="lower", cmap="inferno", extent=[0, 1, 0, 1])
+    im = ax.imshow(grids[0], origin="lower", cmap="inferno", extent=[0, 1, 0, 1])
 
     ax.set_xlabel("$x$-coordinate", fontsize=18)
     ax.set_ylabel("$y$-coordinate", fontsize=18)
@@ -112,9 +115,7 @@ def animation(width, D, dt, total_time):
     fig.colorbar(im, ax=ax)
 
     def animate(i):
-        t = (i / 50) * total_time
-        grid = time_dep_diff(width, D, dt, t)
-        im.set_array(grid)
+        im.set_array(grids[i])
         return im
 
     ani = FuncAnimation(fig, animate, frames=50, repeat=False, interval=50, blit=False)
@@ -8,11 +8,24 @@ File description:
 """
 
 import numpy as np
-from numba import njit
-from scientific_computing.laplace import initialize_grid, sor
+from numba import njit, set_num_threads
+from scientific_computing.laplace import (
+    initialize_grid,
+    pad_grid,
+    interpolate_grid,
+    sor_constants,
+    sor_sweep,
+    red_black_iterate,
+    sor,
+    sor_iterations,
+    golden_section_omega,
+    adapt_omega,
+    sor_tiled_iterate,
+    refine_iterate,
+)
 
 
-@njit
+@njit(cache=True)
 def create_objects(list_objects, width):
     objects_grid = initialize_grid(width)
     for objects in list_objects:
@@ -21,49 +34,244 @@ def create_objects(list_objects, width):
     return objects_grid
 
 
-@njit
-def sor_with_objects(width, eps, omega, objects):
+@njit(cache=True)
+def sor_iterate_objects(grid, eps, omega, objects, delta_list, k, max_iter):
+    """
+    Applies SOR sweeps with objects in place to the padded grid until delta
+    is smaller than eps or max_iter is reached, starting after k sweeps.
+    Delta of sweep k is stored in delta_list[k]. Returns the number of
+    sweeps done in total.
+    """
+    delta = np.inf if k == 0 else delta_list[k - 1]
+    while delta >= eps and k < max_iter:
+        delta = sor_sweep(grid, omega, objects)
+        delta_list[k] = delta
+        k = k + 1
+
+    return k
+
+
+@njit(cache=True)
+def sor_with_objects(
+    width, eps, omega, objects, max_iter=10000, initial_grid=None, dtype=np.float64
+):
     """
     Given the input makes an initial grid and updates this
-    for a given time. Returns final grid.
+    for a given time. Returns final grid. If initial_grid is given the
+    iteration starts from it instead. With omega="auto" omega is tuned
+    during the solve, and the omega it ended with is returned too. The grid
+    has the floating point type dtype.
     """
 
     # Initialize the grid
-    new_grid = initialize_grid(width)
+    if initial_grid is None:
+        grid = pad_grid(initialize_grid(width, dtype))
+    else:
+        grid = pad_grid(initial_grid.astype(dtype))
 
     # Update grid while difference larger than epsilon
-    delta = 100
-    delta_list = []
+    delta_list = np.empty(max_iter)
+    if isinstance(omega, str):
+        if omega != "auto":
+            raise ValueError("omega must be a number or 'auto'")
+        omega_auto, previous, changed, adapting = 1.0, 1.0, 0, True
+        k = 0
+        while True:
+            stop = min(k + 10, max_iter)
+            k = sor_iterate_objects(grid, eps, omega_auto, objects, delta_list, k, stop)
+            if k < stop or k == max_iter:
+                return grid[:, 1:-1].copy(), k, delta_list[:k], omega_auto
+            omega_auto, previous, changed, adapting = adapt_omega(
+                delta_list, k, omega_auto, previous, changed, adapting, width
+            )
+
+    k = sor_iterate_objects(grid, eps, omega, objects, delta_list, 0, max_iter)
+
+    return grid[:, 1:-1].copy(), k, delta_list[:k]
+
+
+@njit(cache=True)
+def sor_with_objects_tiled(
+    width, eps, omega, objects, sweeps=8, max_iter=10000, dtype=np.float64
+):
+    """
+    SOR with objects doing sweeps sweeps per pass over the grid, like
+    sor_tiled. Gives the same sweeps as sor_with_objects, but can do up to
+    sweeps - 1 more.
+    """
+    grid = pad_grid(initialize_grid(width, dtype))
+    delta_list = np.empty(max_iter)
+    k = sor_tiled_iterate(grid, eps, omega, delta_list, max_iter, sweeps, objects)
+
+    return grid[:, 1:-1].copy(), k, delta_list[:k]
+
+
+@njit(cache=True)
+def sor_with_objects_mixed_precision(
+    width, eps, omega, objects, reduction=0.001, max_iter=10000
+):
+    """
+    SOR with objects with the sweeps in float32 and the solution in
+    float64, by iterative refinement like sor_mixed_precision.
+    """
+    grid = pad_grid(initialize_grid(width))
+    delta_list = np.empty(max_iter)
+    k = refine_iterate(grid, eps, omega, delta_list, max_iter, reduction, objects)
+
+    return grid[:, 1:-1].copy(), k, delta_list[:k]
+
+
+def nested_iteration(eps, list_N, omega=None, list_objects=None, max_iter=10000):
+    """
+    Solves with SOR for every width in list_N from small to large, starting
+    each solve from the previous solution interpolated onto the finer grid.
+    If omega is None the optimum 2 / (1 + sin(pi / N)) of the grid without
+    objects is used. Returns a list of (grid, number of iterations) in the
+    order of list_N.
+    """
+    results = {}
+    grid = None
+    for N in sorted(list_N):
+        w = 2 / (1 + np.sin(np.pi / N)) if omega is None else omega
+        initial_grid = None if grid is None else interpolate_grid(grid, N)
+        if list_objects is None:
+            grid, k, delta_list = sor(N, eps, w, max_iter, initial_grid)
+        else:
+            objects = create_objects(list_objects, N)
+            grid, k, delta_list = sor_with_objects(
+                N, eps, w, objects, max_iter, initial_grid
+            )
+        results[N] = (grid, k)
+
+    return [results[N] for N in list_N]
+
+
+@njit(cache=True)
+def free_runs(objects):
+    """
+    Returns the runs of free cells (not covered by an object) in the
+    interior rows, as an array with rows (row, first column, last column + 1)
+    in the order of a lexicographic sweep.
+    """
+    width = objects.shape[1]
+    runs = []
+    for i in range(1, objects.shape[0] - 1):
+        j = 0
+        while j < width:
+            if objects[i, j] == 1:
+                j = j + 1
+                continue
+            start = j
+            while j < width and objects[i, j] != 1:
+                j = j + 1
+            runs.append((i, start, j))
+
+    result = np.empty((len(runs), 3), dtype=np.int64)
+    for r in range(len(runs)):
+        result[r, 0], result[r, 1], result[r, 2] = runs[r]
+
+    return result
+
+
+@njit(cache=True)
+def sor_sweep_runs(grid, omega, runs):
+    """
+    One lexicographic SOR sweep in place over only the free cells of the
+    padded grid, given as runs by free_runs. The cells covered by an object
+    are never visited and stay 0. Returns the largest change of a cell.
+    """
+    width = grid.shape[1] - 2
+    delta = 0.0
+
+    quarter_omega, keep = sor_constants(grid, omega)
+
+    for r in range(runs.shape[0]):
+        i = runs[r, 0]
+        for j in range(runs[r, 1] + 1, runs[r, 2] + 1):
+            old = grid[i, j]
+            grid[i, j] = (
+                quarter_omega
+                * (grid[i + 1, j] + grid[i - 1, j] + grid[i, j - 1] + grid[i, j + 1])
+                + keep * old
+            )
+            delta = max(delta, abs(grid[i, j] - old))
+
+            # The last cell of the row needs the new value of the first
+            if j == 1:
+                grid[i, width + 1] = grid[i, 1]
+
+        if runs[r, 2] == width:
+            grid[i, 0] = grid[i, width]
+
+    return delta
+
+
+@njit(cache=True)
+def sor_with_objects_runs(width, eps, omega, objects, max_iter=10000, dtype=np.float64):
+    """
+    SOR with objects that only sweeps the free cells, so the work per sweep
+    scales with the free area instead of the whole grid. Gives the same
+    result as sor_with_objects.
+    """
+    runs = free_runs(objects)
+
+    # Initialize the grid
+    grid = pad_grid(initialize_grid(width, dtype))
+
+    # Update grid while difference larger than epsilon
+    delta = np.inf
+    delta_list = np.empty(max_iter)
     k = 0
-    while delta >= eps and k < 10000:
-        grid = new_grid.copy()
-        for i in range(1, width - 1):
-            for j in range(width):
-                if objects[i, j] == 1:
-                    new_grid[i, j] = 0
-                else:
-                    new_grid[i, j] = (
-                        0.25
-                        * omega
-                        * (
-                            new_grid[(i + 1) % (width), j]
-                            + new_grid[(i - 1) % (width), j]
-                            + new_grid[i, (j - 1) % (width)]
-                            + new_grid[i, (j + 1) % (width)]
-                        )
-                        + (1 - omega) * new_grid[i, j]
-                    )
-
-        delta = np.max(np.abs(new_grid - grid))
-        delta_list.append(delta)
+    while delta >= eps and k < max_iter:
+        delta = sor_sweep_runs(grid, omega, runs)
+        delta_list[k] = delta
         k = k + 1
 
-    return new_grid, k, delta_list
+    return grid[:, 1:-1].copy(), k, delta_list[:k]
 
 
+# Not cached, see red_black_iterate
 @njit
-def optimal_omega_objects(width, eps, objects):
+def sor_with_objects_red_black(
+    width, eps, omega, objects, num_threads=0, max_iter=10000, dtype=np.float64
+):
+    """
+    SOR with objects using red-black (checkerboard) ordering, each colour is
+    swept in parallel over the rows. If num_threads is larger than 0 it sets
+    the number of threads Numba uses. Returns final grid, number of
+    iterations and the delta values, like sor_with_objects.
+    """
+    if num_threads > 0:
+        set_num_threads(num_threads)
+
+    grid = pad_grid(initialize_grid(width, dtype))
+    delta_list = np.empty(max_iter)
+    k = red_black_iterate(grid, eps, omega, delta_list, max_iter, objects)
+
+    return grid[:, 1:-1].copy(), k, delta_list[:k]
+
+
+@njit(cache=True)
+def sor_with_objects_iterations(width, eps, omega, objects, max_iter):
+    """
+    Returns the number of iterations of SOR with objects. This is the solve
+    function golden_section_omega expects.
+    """
+    return sor_with_objects(width, eps, omega, objects, max_iter)[1]
+
+
+def optimal_omega_objects(width, eps, objects, search="grid"):
+    """
+    Returns the omega for which SOR with objects needs the least iterations.
+    With search="grid" every omega is tried, with search="golden" a golden
+    section search is used.
+    """
     omega_list = np.arange(1.5, 1.999, 0.001)
+    if search == "golden":
+        return golden_section_omega(
+            sor_with_objects_iterations, width, eps, objects, omega_list
+        )
+
     num_iterations = []
 
     for omega in omega_list:
@@ -75,8 +283,7 @@ def optimal_omega_objects(width, eps, objects):
     return omega_list[index]
 
 
-@njit
-def calculate_optimal_omega_objects(eps, list_objects, list_N):
+def calculate_optimal_omega_objects(eps, list_objects, list_N, search="grid"):
     """
     Returns figure for the optimal value of omega versus the width of the grid.
     """
@@ -87,15 +294,24 @@ def calculate_optimal_omega_objects(eps, list_objects, list_N):
 
     for N in list_N:
         objects = create_objects(list_objects, N)
-        omega = optimal_omega_objects(N, eps, objects)
+        omega = optimal_omega_objects(N, eps, objects, search)
         list_omega.append(omega)
 
     return list_omega
 
 
-@njit
-def optimal_omega(width, eps):
+def optimal_omega(width, eps, search="grid"):
+    """
+    Returns the omega for which SOR needs the least iterations. With
+    search="grid" every omega is tried, with search="golden" a golden
+    section search is used.
+    """
     omega_list = np.arange(1.5, 1.999, 0.001)
+    if search == "golden":
+        return golden_section_omega(
+            sor_iterations, width, eps, np.zeros((1, 1)), omega_list
+        )
+
     num_iterations = []
 
     for omega in omega_list:
@@ -108,8 +324,7 @@ def optimal_omega(width, eps):
     return omega_list[index]
 
 
-@njit
-def calculate_optimal_omega(eps, list_N):
+def calculate_optimal_omega(eps, list_N, search="grid"):
     """
     Returns figure for the optimal value of omega versus the width of the grid.
     """
@@ -117,6 +332,6 @@ def calculate_optimal_omega(eps, list_N):
     list_omega = []
 
     for N in list_N:
-        omega = optimal_omega(N, eps)
+        omega = optimal_omega(N, eps, search)
         list_omega.append(omega)
     return list_omega
@@ -0,0 +1,55 @@
+"""
+Course: Scientific computing
+Names: Lisa Pijpers, Petr Chalupský and Tika van Bennekum
+Student IDs: 15746704, 15719227 and 13392425
+
+File description:
+    Analytical solution of the time dependent diffusion equation, shared by
+    the Laplace and time dependent diffusion code.
+"""
+
+import numpy as np
+from functools import lru_cache
+from scipy.special import erfc, erfcinv
+
+
+def diffusion_profile(D, t, y, tol=1e-16, max_terms=10001):
+    """
+    Calculates the analytical solution of the time dependent diffusion
+    equation at the positions y between 0 and 1. The series is evaluated for
+    all y at once and stops at the first term below tol, at most max_terms
+    terms are used.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    sqrt_term = 2 * np.sqrt(D * t)
+
+    # From this term on erfc((1 - y + 2i) / sqrt_term) is smaller than tol
+    n_terms = int(np.ceil((erfcinv(tol) * sqrt_term - 1 + np.max(y, initial=0)) / 2))
+    n_terms = min(max(n_terms + 1, 1), max_terms)
+    i_values = np.arange(n_terms)
+
+    return np.sum(
+        erfc((1 - y[..., None] + 2 * i_values) / sqrt_term)
+        - erfc((1 + y[..., None] + 2 * i_values) / sqrt_term),
+        axis=-1,
+    )
+
+
+@lru_cache(maxsize=256)
+def cached_profile(D, t, ny, max_terms):
+    """
+    Returns the analytical solution on ny evenly spaced points between 0 and
+    1 as a read-only array. The result is cached per (D, t, ny, max_terms).
+    """
+    solution = diffusion_profile(D, t, np.linspace(0, 1, ny), max_terms=max_terms)
+    solution.flags.writeable = False
+
+    return solution
+
+
+def analytical_solution(D, t, ny=50, max_terms=10001):
+    """
+    Calculates analytical solution of time dependent diffusion equation
+    assuming y between 0 and 1, on ny evenly spaced points.
+    """
+    return cached_profile(D, t, ny, max_terms).copy()
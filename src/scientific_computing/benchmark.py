@@ -0,0 +1,201 @@
+"""
+Course: Scientific computing
+Names: Lisa Pijpers, Petr Chalupský and Tika van Bennekum
+Student IDs: 15746704, 15719227 and 13392425
+
+File description:
+    Benchmarks the solvers over a range of grid sizes. The JIT compilation
+    (warm-up) is timed separately from the steady state, and the results
+    can be compared against a stored baseline to find regressions.
+    Run from the root of the repository with:
+        python -m scientific_computing.benchmark --output bench.json
+        python -m scientific_computing.benchmark --compare bench.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import numba
+import numpy as np
+from scientific_computing.laplace import jacobi_iteration, gauss_seidel, sor, sor_tiled
+from scientific_computing.add_object_SOR import create_objects, sor_with_objects
+from scientific_computing.time_dep_diff import time_dep_diff
+from scientific_computing.vibrating_string import solve_vibrating_string
+
+eps = 0.00001
+
+# Objects as fractions of the width (row start, row end, column start, column end)
+object_fractions = np.array([[0.15, 0.4, 0.2, 0.5], [0.6, 0.85, 0.55, 0.9]])
+
+
+def setup_objects(N):
+    """
+    Returns the arguments of sor_with_objects for a grid of width N.
+    """
+    list_objects = (object_fractions * N).astype(np.int64)
+    return (N, eps, 2 / (1 + np.sin(np.pi / N)), create_objects(list_objects, N))
+
+
+def run_laplace(solver):
+    """
+    Returns a benchmark function for a Laplace solver, which returns the
+    number of iterations and of cell updates.
+    """
+
+    def run(*args):
+        k = solver(*args)[1]
+        N = args[0]
+        return k, k * (N - 2) * N
+
+    return run
+
+
+def run_time_dep_diff(N, D, dt, t, steps):
+    """
+    Runs the time dependent diffusion, returns the number of time steps and
+    of cell updates.
+    """
+    time_dep_diff(N, D, dt, t)
+    return steps, steps * (N - 2) * N
+
+
+def run_vibrating_string(dx, dt):
+    """
+    Runs the vibrating string, returns the number of time levels and of cell
+    updates.
+    """
+    u = solve_vibrating_string(dx, dt)
+    return u.shape[0], u.shape[0] * (u.shape[1] - 2)
+
+
+def setup_time_dep_diff(N):
+    """
+    Returns the arguments of run_time_dep_diff for a grid of width N, which
+    takes 100 stable time steps.
+    """
+    dt = 0.2 / N**2
+    return (N, 1, dt, 100.5 * dt, 100)
+
+
+# Solver name, function that builds the arguments for a width N and the
+# function that runs the solver and returns (iterations, cell updates)
+cases = {
+    "jacobi": (lambda N: (N, eps), run_laplace(jacobi_iteration)),
+    "gauss_seidel": (lambda N: (N, eps), run_laplace(gauss_seidel)),
+    "sor": (
+        lambda N: (N, eps, 2 / (1 + np.sin(np.pi / N))),
+        run_laplace(sor),
+    ),
+    "sor_tiled": (
+        lambda N: (N, eps, 2 / (1 + np.sin(np.pi / N))),
+        run_laplace(sor_tiled),
+    ),
+    "sor_with_objects": (setup_objects, run_laplace(sor_with_objects)),
+    "time_dep_diff": (setup_time_dep_diff, run_time_dep_diff),
+    "vibrating_string": (lambda N: (1 / N, 1 / N), run_vibrating_string),
+}
+
+
+def benchmark(solvers, sizes, repeats=3, warmup_size=10):
+    """
+    Benchmarks the solvers for every size. The first call with a small grid
+    compiles the solver and is reported as warm-up, after which the best of
+    repeats calls is taken as the steady state time.
+    """
+    results = []
+    for solver in solvers:
+        setup, run = cases[solver]
+
+        start = time.perf_counter()
+        run(*setup(warmup_size))
+        warmup = time.perf_counter() - start
+
+        for N in sizes:
+            args = setup(N)
+            seconds = np.inf
+            for repeat in range(repeats):
+                start = time.perf_counter()
+                iterations, updates = run(*args)
+                seconds = min(seconds, time.perf_counter() - start)
+
+            results.append(
+                {
+                    "solver": solver,
+                    "N": int(N),
+                    "warmup_seconds": warmup,
+                    "seconds": seconds,
+                    "iterations": int(iterations),
+                    "cell_updates_per_second": updates / seconds,
+                }
+            )
+
+    return {
+        "python": platform.python_version(),
+        "numba": numba.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "threads": numba.config.NUMBA_NUM_THREADS,
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance=0.1):
+    """
+    Compares a report against a baseline. Returns a list of messages for the
+    results whose throughput dropped by more than the tolerance (a fraction)
+    or that need more iterations than in the baseline.
+    """
+    old = {(r["solver"], r["N"]): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        key = (result["solver"], result["N"])
+        if key not in old:
+            continue
+
+        ratio = result["cell_updates_per_second"] / old[key]["cell_updates_per_second"]
+        if ratio < 1 - tolerance:
+            regressions.append(
+                f"{key[0]} N={key[1]}: {ratio:.2f}x the cell updates per second"
+            )
+        if result["iterations"] > old[key]["iterations"]:
+            regressions.append(
+                f"{key[0]} N={key[1]}: {result['iterations']} iterations instead"
+                f" of {old[key]['iterations']}"
+            )
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the solvers.")
+    parser.add_argument("--solvers", nargs="+", default=list(cases), choices=cases)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[25, 50, 100])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="file to write the results to as JSON")
+    parser.add_argument("--compare", help="baseline JSON file to compare with")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.1, help="allowed slowdown fraction"
+    )
+    args = parser.parse_args()
+
+    report = benchmark(args.solvers, args.sizes, args.repeats)
+    for r in report["results"]:
+        print(
+            f"{r['solver']:>18} N={r['N']:<5} {r['seconds']:9.4f} s "
+            f"{r['iterations']:6d} iterations "
+            f"{r['cell_updates_per_second']:.3e} cell updates/s "
+            f"(warm-up {r['warmup_seconds']:.2f} s)"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        sys.exit(1 if regressions else 0)
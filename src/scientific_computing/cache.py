@@ -0,0 +1,207 @@
+"""
+Course: Scientific computing
+Names: Lisa Pijpers, Petr Chalupský and Tika van Bennekum
+Student IDs: 15746704, 15719227 and 13392425
+
+File description:
+    Persistent on-disk cache for solver results. Results are stored under a
+    hash of the function, its arguments and the source code it depends on,
+    so rerunning a script after an unrelated change loads them from disk.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import types
+import numpy as np
+
+# Default location and size limit of the cache
+cache_dir = os.environ.get("SCIENTIFIC_COMPUTING_CACHE", "data/cache")
+max_cache_bytes = 2 * 1024**3
+
+
+def hash_value(value, digest):
+    """
+    Adds a value (array, number, string, None, dtype or a list, tuple or
+    dictionary of these) to the hash.
+    """
+    scalar_types = (np.generic, bool, int, float, complex)
+    if isinstance(value, np.dtype) or (
+        isinstance(value, type) and issubclass(value, scalar_types)
+    ):
+        digest.update(f"dtype{np.dtype(value).str}".encode())
+    elif isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        digest.update(f"array{value.dtype.str}{value.shape}".encode())
+        digest.update(value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            hash_value(item, digest)
+    elif isinstance(value, dict):
+        digest.update(f"dict{len(value)}".encode())
+        for key in sorted(value):
+            hash_value(key, digest)
+            hash_value(value[key], digest)
+    elif isinstance(value, np.generic):
+        hash_value(value.item(), digest)
+    elif value is None or isinstance(value, (bool, int, float, str)):
+        digest.update(f"{type(value).__name__}{value!r}".encode())
+    else:
+        raise TypeError(f"Cannot cache an argument of type {type(value)}")
+
+
+def code_version(module_name):
+    """
+    Returns a hash of the source of the module and of all modules of this
+    package it uses, directly or indirectly.
+    """
+    package = module_name.split(".")[0]
+    digest = hashlib.sha256()
+    todo = [module_name]
+    seen = set()
+    while todo:
+        name = todo.pop()
+        if name in seen or name not in sys.modules:
+            continue
+        seen.add(name)
+        module = sys.modules[name]
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+
+        # Modules of the package that this module refers to
+        for value in vars(module).values():
+            if isinstance(value, types.ModuleType):
+                used = value.__name__
+            else:
+                used = getattr(value, "__module__", None)
+            if isinstance(used, str) and used.split(".")[0] == package:
+                todo.append(used)
+
+    return digest.hexdigest()
+
+
+def cache_key(func, args, kwargs):
+    """
+    Returns the key of a call: a hash of the function name, the arguments and
+    the version of the code. The arguments are bound to the parameters with
+    the defaults filled in, so positional, keyword and default arguments
+    with the same values give the same key.
+    """
+    func = getattr(func, "py_func", func)
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    digest = hashlib.sha256()
+    digest.update(f"{func.__module__}.{func.__qualname__}".encode())
+    digest.update(code_version(func.__module__).encode())
+    hash_value(dict(bound.arguments), digest)
+
+    return digest.hexdigest()
+
+
+def store_value(value, path, files):
+    """
+    Writes the arrays in a result to path and returns a description of the
+    result that load_value can rebuild it from.
+    """
+    if isinstance(value, tuple):
+        return {"kind": "tuple", "items": [store_value(v, path, files) for v in value]}
+    if isinstance(value, (np.ndarray, list)):
+        name = f"{len(files)}.npy"
+        files.append(name)
+        np.save(os.path.join(path, name), np.asarray(value))
+        kind = "array" if isinstance(value, np.ndarray) else "list"
+        return {"kind": kind, "file": name}
+    if isinstance(value, np.generic):
+        value = value.item()
+
+    return {"kind": "scalar", "value": value}
+
+
+def load_value(description, path):
+    """
+    Rebuilds a result from its description, arrays are memory-mapped.
+    """
+    kind = description["kind"]
+    if kind == "tuple":
+        return tuple(load_value(item, path) for item in description["items"])
+    if kind == "scalar":
+        return description["value"]
+
+    array = np.load(os.path.join(path, description["file"]), mmap_mode="r")
+    if kind == "list":
+        return array.tolist()
+
+    return array
+
+
+def entry_size(path):
+    """
+    Returns the number of bytes used by a cache entry.
+    """
+    return sum(entry.stat().st_size for entry in os.scandir(path))
+
+
+def evict(directory, max_bytes):
+    """
+    Removes the least recently used entries until the cache is at most
+    max_bytes large.
+    """
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_dir() and not entry.name.startswith("."):
+            entries.append((entry.stat().st_mtime, entry_size(entry.path), entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def cached(func, directory=None, max_bytes=None):
+    """
+    Returns a version of func whose results are stored on disk. A call with
+    the same arguments, object masks and code loads the stored result instead.
+    The arrays of a loaded result are memory-mapped and read-only, unlike
+    those of a result that was just computed, so copy them before changing
+    them. When the cache grows beyond max_bytes the least recently used
+    results are removed.
+    """
+    directory = cache_dir if directory is None else directory
+    max_bytes = max_cache_bytes if max_bytes is None else max_bytes
+
+    @functools.wraps(getattr(func, "py_func", func))
+    def wrapper(*args, **kwargs):
+        path = os.path.join(directory, cache_key(func, args, kwargs))
+        if os.path.isdir(path):
+            # Mark the entry as recently used
+            os.utime(path)
+            with open(os.path.join(path, "result.json")) as f:
+                return load_value(json.load(f), path)
+
+        result = func(*args, **kwargs)
+
+        # Write to a temporary directory first, so entries are always complete
+        os.makedirs(directory, exist_ok=True)
+        temporary = os.path.join(directory, f".tmp-{os.getpid()}-{id(result)}")
+        os.makedirs(temporary, exist_ok=True)
+        description = store_value(result, temporary, [])
+        with open(os.path.join(temporary, "result.json"), "w") as f:
+            json.dump(description, f)
+        try:
+            os.rename(temporary, path)
+        except OSError:
+            # Another process stored the same result first
+            shutil.rmtree(temporary, ignore_errors=True)
+
+        evict(directory, max_bytes)
+
+        return result
+
+    return wrapper
@@ -9,18 +9,19 @@ File description:
 """
 
 import numpy as np
-from scipy.special import erfc
-from numba import njit
+from scipy.sparse import csr_matrix
+from numba import njit, prange, set_num_threads
+from scientific_computing import analytical
 
 
-@njit
-def initialize_grid(width):
+@njit(cache=True)
+def initialize_grid(width, dtype=np.float64):
     """
     Initialize grid given a width as parameter. It assumes a square grid.
     The upper row is equal to 1. The rest of the grid is equal to 0.
     """
     # Set empty grid
-    c = np.zeros((width, width))
+    c = np.zeros((width, width), dtype=dtype)
 
     # Set upper and lower boundary conditions
     c[width - 1, :] = 1
@@ -28,103 +29,553 @@ def initialize_grid(width):
     return c
 
 
-def jacobi_iteration(width, eps):
+@njit(cache=True)
+def pad_grid(grid):
     """
-    Given the input makes an initial grid and updates this
-    for a given time. Returns final grid.
+    Returns a copy of the grid with a ghost column on both sides holding the
+    periodic neighbours, so that the sweeps need no modulo indexing.
     """
+    width = grid.shape[1]
+    padded = np.empty((grid.shape[0], width + 2), dtype=grid.dtype)
+    padded[:, 1:-1] = grid
+    padded[:, 0] = grid[:, width - 1]
+    padded[:, width + 1] = grid[:, 0]
 
-    # Initialize the grid
-    new_grid = initialize_grid(width)
+    return padded
 
-    # Update grid while difference larger than epsilon
-    delta = 100
-    delta_list = []
-    k = 0
-    while delta >= eps and k < 10000:
-        grid = new_grid.copy()
-        for i in range(1, width - 1):
-            for j in range(width):
-                new_grid[i, j] = 0.25 * (
-                    grid[(i + 1) % (width), j]
-                    + grid[(i - 1) % (width), j]
-                    + grid[i, (j - 1) % (width)]
-                    + grid[i, (j + 1) % (width)]
-                )
 
-        delta = np.max(np.abs(new_grid - grid))
-        delta_list.append(delta)
+@njit(cache=True)
+def interpolate_grid(grid, width):
+    """
+    Interpolates a grid bilinearly onto a grid of the given width, with y
+    going from 0 to 1 over the rows and x periodic over the columns. Gives
+    the initial grid of a finer solve from a coarser solution.
+    """
+    n = grid.shape[0]
+    fine = np.empty((width, width), dtype=grid.dtype)
+
+    for i in range(width):
+        y = i * (n - 1) / (width - 1)
+        i0 = min(int(y), n - 2)
+        wy = y - i0
+        for j in range(width):
+            x = j * n / width
+            j0 = int(x)
+            wx = x - j0
+            j1 = (j0 + 1) % n
+            fine[i, j] = (1 - wy) * (
+                (1 - wx) * grid[i0, j0] + wx * grid[i0, j1]
+            ) + wy * ((1 - wx) * grid[i0 + 1, j0] + wx * grid[i0 + 1, j1])
+
+    return fine
+
+
+@njit(cache=True)
+def jacobi_sweep(grid, new_grid):
+    """
+    One Jacobi sweep from the padded grid into the padded new_grid, without
+    allocating. Returns the largest change of a cell.
+    """
+    width = grid.shape[1] - 2
+    delta = 0.0
+    quarter = grid.dtype.type(0.25)
+
+    for i in range(1, grid.shape[0] - 1):
+        for j in range(1, width + 1):
+            new_grid[i, j] = quarter * (
+                grid[i + 1, j] + grid[i - 1, j] + grid[i, j - 1] + grid[i, j + 1]
+            )
+            delta = max(delta, abs(new_grid[i, j] - grid[i, j]))
+
+        # Update the ghost columns
+        new_grid[i, 0] = new_grid[i, width]
+        new_grid[i, width + 1] = new_grid[i, 1]
+
+    return delta
+
+
+@njit(cache=True)
+def jacobi_iterate(buffers, eps, delta_list, k, max_iter):
+    """
+    Applies Jacobi sweeps, alternating between the two padded grids in
+    buffers, until delta is smaller than eps or max_iter is reached. The
+    current grid after k sweeps is buffers[k % 2] and delta of sweep k is
+    stored in delta_list[k]. Returns the number of sweeps done in total.
+    """
+    delta = np.inf if k == 0 else delta_list[k - 1]
+    while delta >= eps and k < max_iter:
+        delta = jacobi_sweep(buffers[k % 2], buffers[(k + 1) % 2])
+        delta_list[k] = delta
         k = k + 1
 
-    return new_grid, k, delta_list
+    return k
 
 
-def gauss_seidel(width, eps):
+@njit(cache=True)
+def jacobi_iteration(width, eps, max_iter=10000, dtype=np.float64):
     """
     Given the input makes an initial grid and updates this
     for a given time. Returns final grid.
     """
 
-    # Initialize the grid
-    new_grid = initialize_grid(width)
+    # Initialize the two grids Jacobi alternates between
+    buffers = np.empty((2, width, width + 2), dtype=dtype)
+    buffers[0] = pad_grid(initialize_grid(width, dtype))
+    buffers[1] = buffers[0]
 
     # Update grid while difference larger than epsilon
-    delta = 100
-    delta_list = []
-    k = 0
-    while delta >= eps and k < 10000:
-        grid = new_grid.copy()
-        for i in range(1, width - 1):
-            for j in range(width):
-                new_grid[i, j] = 0.25 * (
-                    new_grid[(i + 1) % (width), j]
-                    + new_grid[(i - 1) % (width), j]
-                    + new_grid[i, (j - 1) % (width)]
-                    + new_grid[i, (j + 1) % (width)]
-                )
+    delta_list = np.empty(max_iter)
+    k = jacobi_iterate(buffers, eps, delta_list, 0, max_iter)
+
+    return buffers[k % 2, :, 1:-1].copy(), k, delta_list[:k]
+
+
+@njit(cache=True)
+def sor_constants(grid, omega):
+    """
+    Returns 0.25 * omega and 1 - omega in the floating point type of the
+    grid. Constants in float64 would promote every update of a float32 grid
+    to float64, which makes float32 slower instead of faster.
+    """
+    return grid.dtype.type(0.25 * omega), grid.dtype.type(1 - omega)
+
+
+@njit(cache=True)
+def sor_row(grid, i, quarter_omega, keep, objects, start=1, step=1, rhs=None):
+    """
+    Relaxes row i of the padded grid in place with SOR, where quarter_omega
+    is 0.25 * omega and keep is 1 - omega, for the columns from start with
+    the given step. If objects is not None the cells covered by an object
+    are kept at 0. If rhs is not None it is added to the sum of the
+    neighbours, which solves the Laplace equation with right-hand side rhs
+    (see refine_iterate). Returns the largest change of a cell.
+    """
+    width = grid.shape[1] - 2
+    delta = 0.0
+
+    for j in range(start, width + 1, step):
+        old = grid[i, j]
+        if objects is not None and objects[i, j - 1] == 1:
+            grid[i, j] = 0
+        else:
+            total = grid[i + 1, j] + grid[i - 1, j] + grid[i, j - 1] + grid[i, j + 1]
+            if rhs is not None:
+                total = total + rhs[i, j]
+            grid[i, j] = quarter_omega * total + keep * old
+        delta = max(delta, abs(grid[i, j] - old))
+
+        # The last cell of the row needs the new value of the first
+        if j == 1:
+            grid[i, width + 1] = grid[i, 1]
+
+    grid[i, 0] = grid[i, width]
+
+    return delta
+
 
-        delta = np.max(np.abs(new_grid - grid))
-        delta_list.append(delta)
+@njit(cache=True)
+def sor_sweep(grid, omega, objects=None, rhs=None):
+    """
+    One lexicographic SOR sweep in place over the padded grid. If objects is
+    not None the cells covered by an object are kept at 0, rhs is passed on
+    to sor_row. Returns the largest change of a cell.
+    """
+    quarter_omega, keep = sor_constants(grid, omega)
+    delta = 0.0
+
+    for i in range(1, grid.shape[0] - 1):
+        delta = max(delta, sor_row(grid, i, quarter_omega, keep, objects, 1, 1, rhs))
+
+    return delta
+
+
+@njit(cache=True)
+def sor_iterate(grid, eps, omega, delta_list, k, max_iter):
+    """
+    Applies SOR sweeps in place to the padded grid until delta is smaller
+    than eps or max_iter is reached, starting after k sweeps. Delta of sweep
+    k is stored in delta_list[k]. Returns the number of sweeps done in total.
+    """
+    delta = np.inf if k == 0 else delta_list[k - 1]
+    while delta >= eps and k < max_iter:
+        delta = sor_sweep(grid, omega)
+        delta_list[k] = delta
         k = k + 1
 
-    return new_grid, k, delta_list
+    return k
 
 
-@njit
-def sor(width, eps, omega):
+@njit(cache=True)
+def estimate_omega(delta_list, k, omega, window):
+    """
+    Estimates the optimal omega from the convergence rate r of the last
+    window sweeps, which were done with the given omega. The spectral
+    radius mu of Jacobi follows from (r + omega - 1)^2 = r omega^2 mu^2,
+    the optimal omega is then 2 / (1 + sqrt(1 - mu^2)). If the rate is too
+    noisy to give mu^2 < 1 the given omega is returned.
+    """
+    r = (delta_list[k - 1] / delta_list[k - 1 - window]) ** (1 / window)
+    if r >= 1:
+        return omega
+
+    mu2 = (r + omega - 1) ** 2 / (r * omega**2)
+    if mu2 >= 1:
+        return omega
+
+    return 2 / (1 + np.sqrt(1 - mu2))
+
+
+@njit(cache=True)
+def adapt_omega(delta_list, k, omega, previous, changed, adapting, width, window=10):
+    """
+    Updates omega for SOR with omega="auto" after each chunk of window
+    sweeps, which starts with omega 1. Once 2 * window sweeps were done
+    since omega last changed, omega is raised to the estimate of
+    estimate_omega, until this gains less than 0.0005. The estimate is
+    capped at the optimum 2 / (1 + sin(pi / 2N)) of a grid twice as wide,
+    since objects only lower the optimum. If delta grew over the last
+    window sweeps, omega goes back to the previous omega and stops adapting.
+    Returns the new omega, the omega before it, the sweep at which it last
+    changed and whether it still adapts.
+    """
+    if adapting and k - changed >= 2 * window:
+        if changed > 0 and delta_list[k - 1] >= delta_list[k - 1 - window]:
+            return previous, previous, k, False
+
+        new_omega = estimate_omega(delta_list, k, omega, window)
+        new_omega = min(new_omega, 2 / (1 + np.sin(np.pi / (2 * width))))
+        if new_omega - omega < 0.0005:
+            return omega, previous, changed, False
+        return new_omega, omega, k, True
+
+    return omega, previous, changed, adapting
+
+
+@njit(cache=True)
+def gauss_seidel(width, eps, max_iter=10000, dtype=np.float64):
     """
     Given the input makes an initial grid and updates this
     for a given time. Returns final grid.
     """
 
+    # Initialize the grid, Gauss-Seidel is SOR with omega = 1
+    grid = pad_grid(initialize_grid(width, dtype))
+
+    # Update grid while difference larger than epsilon
+    delta_list = np.empty(max_iter)
+    k = sor_iterate(grid, eps, 1.0, delta_list, 0, max_iter)
+
+    return grid[:, 1:-1].copy(), k, delta_list[:k]
+
+
+@njit(cache=True)
+def sor(width, eps, omega, max_iter=10000, initial_grid=None, dtype=np.float64):
+    """
+    Given the input makes an initial grid and updates this
+    for a given time. Returns final grid. If initial_grid is given the
+    iteration starts from it instead, e.g. a previous or interpolated
+    solution. With omega="auto" omega is tuned during the solve by
+    adapt_omega, and the omega it ended with is returned too. That omega
+    fits the end of this solve, it is usually above the best fixed omega
+    of optimal_omega. The grid has the floating point type dtype.
+    """
+
     # Initialize the grid
-    new_grid = initialize_grid(width)
+    if initial_grid is None:
+        grid = pad_grid(initialize_grid(width, dtype))
+    else:
+        grid = pad_grid(initial_grid.astype(dtype))
 
     # Update grid while difference larger than epsilon
-    delta = 100
-    delta_list = []
+    delta_list = np.empty(max_iter)
+    if isinstance(omega, str):
+        if omega != "auto":
+            raise ValueError("omega must be a number or 'auto'")
+        omega_auto, previous, changed, adapting = 1.0, 1.0, 0, True
+        k = 0
+        while True:
+            stop = min(k + 10, max_iter)
+            k = sor_iterate(grid, eps, omega_auto, delta_list, k, stop)
+            if k < stop or k == max_iter:
+                return grid[:, 1:-1].copy(), k, delta_list[:k], omega_auto
+            omega_auto, previous, changed, adapting = adapt_omega(
+                delta_list, k, omega_auto, previous, changed, adapting, width
+            )
+
+    k = sor_iterate(grid, eps, omega, delta_list, 0, max_iter)
+
+    return grid[:, 1:-1].copy(), k, delta_list[:k]
+
+
+@njit(parallel=True, cache=True)
+def red_black_sweep(grid, omega, colour, row_delta, objects=None):
+    """
+    Updates in place all cells of one colour of the checkerboard of the
+    padded grid, i.e. the cells with (i + j) % 2 == colour in the unpadded
+    grid. The rows are updated in parallel, which is safe since all
+    neighbours in the rows above and below have the other colour. For odd
+    widths the last cell of a row has the same colour as the first, which
+    sor_row handles. If objects is not None the cells covered by an object
+    are kept at 0. The largest change per row is stored in row_delta, its
+    maximum is returned.
+    """
+
+    quarter_omega, keep = sor_constants(grid, omega)
+
+    for i in prange(1, grid.shape[0] - 1):
+        row_delta[i] = sor_row(
+            grid, i, quarter_omega, keep, objects, 1 + (i + colour) % 2, 2
+        )
+
+    return np.max(row_delta)
+
+
+@njit(cache=True)
+def sor_wavefront(grid, omega, sweeps, deltas, objects=None):
+    """
+    Applies several lexicographic SOR sweeps in place in a single pass over
+    the padded grid. At step p sweep s relaxes row p - 2 * s, so each row
+    sees the rows above and below it in the same state as in separate
+    sweeps and the result is identical to calling sor_sweep sweeps times,
+    while only about 2 * sweeps rows have to stay in the cache. The largest
+    change of each sweep is stored in deltas.
+    """
+    rows = grid.shape[0] - 2
+
+    quarter_omega, keep = sor_constants(grid, omega)
+
+    deltas[:sweeps] = 0.0
+    for p in range(1, rows + 2 * sweeps - 1):
+        for s in range(sweeps):
+            i = p - 2 * s
+            if 1 <= i <= rows:
+                delta = sor_row(grid, i, quarter_omega, keep, objects)
+                deltas[s] = max(deltas[s], delta)
+
+
+@njit(cache=True)
+def sor_tiled_iterate(grid, eps, omega, delta_list, max_iter, sweeps, objects=None):
+    """
+    Applies passes of sor_wavefront until the delta of a sweep is smaller
+    than eps or max_iter is reached. The last pass can do up to sweeps - 1
+    sweeps more than needed. Returns the number of sweeps done.
+    """
     k = 0
-    while delta >= eps and k < 10000:
-        grid = new_grid.copy()
-        for i in range(1, width - 1):
-            for j in range(width):
-                new_grid[i, j] = (
-                    0.25
-                    * omega
-                    * (
-                        new_grid[(i + 1) % (width), j]
-                        + new_grid[(i - 1) % (width), j]
-                        + new_grid[i, (j - 1) % (width)]
-                        + new_grid[i, (j + 1) % (width)]
-                    )
-                    + (1 - omega) * new_grid[i, j]
+    delta = np.inf
+    while delta >= eps and k < max_iter:
+        n = min(sweeps, max_iter - k)
+        sor_wavefront(grid, omega, n, delta_list[k : k + n], objects)
+        delta = np.min(delta_list[k : k + n])
+        k = k + n
+
+    return k
+
+
+@njit(cache=True)
+def sor_tiled(width, eps, omega, sweeps=8, max_iter=10000, dtype=np.float64):
+    """
+    SOR with sweeps lexicographic sweeps per pass over the grid (see
+    sor_wavefront), which keeps the speed up for grids that do not fit in
+    the cache. Gives the same sweeps as sor, but can do up to sweeps - 1
+    more. Returns final grid, number of iterations and the delta values.
+    """
+    grid = pad_grid(initialize_grid(width, dtype))
+    delta_list = np.empty(max_iter)
+    k = sor_tiled_iterate(grid, eps, omega, delta_list, max_iter, sweeps)
+
+    return grid[:, 1:-1].copy(), k, delta_list[:k]
+
+
+@njit(cache=True)
+def residual(grid, r, objects=None):
+    """
+    Writes the residual of the Laplace equation of the padded grid, the sum
+    of the four neighbours minus 4 times the cell, into the interior rows of
+    the padded r, in the floating point type of r. Cells covered by an
+    object get 0. Returns the largest absolute value.
+    """
+    width = grid.shape[1] - 2
+    largest = 0.0
+
+    for i in range(1, grid.shape[0] - 1):
+        for j in range(1, width + 1):
+            if objects is not None and objects[i, j - 1] == 1:
+                r[i, j] = 0
+            else:
+                r[i, j] = (
+                    grid[i + 1, j]
+                    + grid[i - 1, j]
+                    + grid[i, j - 1]
+                    + grid[i, j + 1]
+                    - 4 * grid[i, j]
                 )
+            largest = max(largest, abs(r[i, j]))
+        r[i, 0] = r[i, width]
+        r[i, width + 1] = r[i, 1]
+
+    return largest
+
+
+@njit(cache=True)
+def refine_iterate(
+    grid, eps, omega, delta_list, max_iter, reduction, objects=None, patience=100
+):
+    """
+    Mixed precision iterative refinement of the float64 padded grid in
+    place. Each step computes the residual in float64 (stored in float32),
+    solves the correction e from the Laplace equation with the residual as right-hand
+    side and zero boundaries with float32 SOR sweeps, and adds e to the grid
+    in float64. A sweep over e is a sweep over grid + e in exact
+    arithmetic, so the deltas are those of SOR and the refinement stops as
+    soon as one is smaller than eps. A step ends once delta dropped by the
+    factor reduction, or when it reached the float32 rounding level and
+    gave no new minimum for patience sweeps. Returns the number of sweeps.
+    """
+    rhs = np.zeros(grid.shape, dtype=np.float32)
+    correction = np.zeros(grid.shape, dtype=np.float32)
+
+    k = 0
+    delta = np.inf
+    while delta >= eps and k < max_iter:
+        residual(grid, rhs, objects)
+        correction[:] = 0
+
+        first = k
+        best = k
+        while k < max_iter:
+            delta = sor_sweep(correction, omega, objects, rhs)
+            delta_list[k] = delta
+            if delta < delta_list[best]:
+                best = k
+            k = k + 1
+            if (
+                delta < eps
+                or delta < reduction * delta_list[first]
+                or k - best > patience
+            ):
+                break
+
+        grid += correction
+
+    return k
+
+
+@njit(cache=True)
+def sor_mixed_precision(width, eps, omega, reduction=0.001, max_iter=10000):
+    """
+    SOR with the sweeps in float32 and the solution in float64, by
+    iterative refinement (see refine_iterate), so tolerances below the
+    float32 precision can be reached. Returns the final float64 grid, the
+    number of float32 sweeps and the delta values.
+    """
+    grid = pad_grid(initialize_grid(width))
+    delta_list = np.empty(max_iter)
+    k = refine_iterate(grid, eps, omega, delta_list, max_iter, reduction)
+
+    return grid[:, 1:-1].copy(), k, delta_list[:k]
+
 
-        delta = np.max(np.abs(new_grid - grid))
-        delta_list.append(delta)
+@njit
+def red_black_iterate(grid, eps, omega, delta_list, max_iter, objects=None):
+    """
+    Applies red-black SOR sweeps in place to the padded grid until delta is
+    smaller than eps or max_iter is reached, with the cells covered by an
+    object kept at 0 if objects is not None. Returns the number of sweeps.
+
+    This function and every jitted function that calls it are not cached:
+    with Numba 0.61 a cached function that calls a parallel kernel (here
+    red_black_sweep) crashes when it is loaded from the cache. The parallel
+    kernels themselves can be cached.
+    """
+    row_delta = np.zeros(grid.shape[0])
+
+    delta = np.inf
+    k = 0
+    while delta >= eps and k < max_iter:
+        delta = max(
+            red_black_sweep(grid, omega, 0, row_delta, objects),
+            red_black_sweep(grid, omega, 1, row_delta, objects),
+        )
+        delta_list[k] = delta
         k = k + 1
 
-    return new_grid, k, delta_list
+    return k
+
+
+# Not cached, see red_black_iterate
+@njit
+def sor_red_black(width, eps, omega, num_threads=0, max_iter=10000, dtype=np.float64):
+    """
+    SOR with red-black (checkerboard) ordering. Each colour is swept in
+    parallel over the rows. If num_threads is larger than 0 it sets the
+    number of threads Numba uses. Returns final grid, number of iterations
+    and the delta values, like sor.
+    """
+    if num_threads > 0:
+        set_num_threads(num_threads)
+
+    grid = pad_grid(initialize_grid(width, dtype))
+    delta_list = np.empty(max_iter)
+    k = red_black_iterate(grid, eps, omega, delta_list, max_iter)
+
+    return grid[:, 1:-1].copy(), k, delta_list[:k]
+
+
+def assemble_laplacian(width, objects=None):
+    """
+    Assembles the 5-point Laplacian (multiplied by -dx^2) on the interior rows
+    of the grid as a sparse matrix, with periodic boundaries in x. Cells
+    covered by an object are fixed at 0 and left out of the system.
+    Returns the matrix and the flat indices of the free cells in
+    grid[1:-1].
+    """
+    n = (width - 2) * width
+    if objects is None:
+        free = np.arange(n)
+    else:
+        free = np.flatnonzero(objects[1:-1].ravel() != 1)
+
+    # Position of each interior cell among the free cells, -1 for objects
+    position = -np.ones(n, dtype=np.int64)
+    position[free] = np.arange(len(free))
+
+    i, j = np.divmod(free, width)
+    rows = [np.arange(len(free))]
+    columns = [np.arange(len(free))]
+    values = [np.full(len(free), 4.0)]
+    for di, dj in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        neighbour_i = i + di
+        neighbour_j = (j + dj) % width
+
+        # Neighbours on the fixed boundary rows only enter the right-hand side
+        inside = np.flatnonzero((neighbour_i >= 0) & (neighbour_i < width - 2))
+        neighbour = position[neighbour_i[inside] * width + neighbour_j[inside]]
+        inside = inside[neighbour >= 0]
+        neighbour = neighbour[neighbour >= 0]
+
+        rows.append(inside)
+        columns.append(neighbour)
+        values.append(-np.ones(len(inside)))
+
+    A = csr_matrix(
+        (np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))),
+        shape=(len(free), len(free)),
+    )
+
+    return A, free
+
+
+def boundary_rhs(width, free, top=1.0, bottom=0.0):
+    """
+    Returns the right-hand side belonging to assemble_laplacian for the given
+    values of the upper and lower row, which can be scalars or arrays of
+    length width.
+    """
+    b = np.zeros((width - 2, width))
+    b[-1, :] += top
+    b[0, :] += bottom
+
+    return b.ravel()[free]
 
 
 def analytical_solution(D, t):
@@ -132,21 +583,101 @@ def analytical_solution(D, t):
     Calculates analytical solution of time dependent diffusion equation
     assuming y between 0 and 1.
     """
+    return analytical.analytical_solution(D, t, 51, max_terms=5000)
 
-    y = np.linspace(0, 1, 51)
-    solution = np.zeros_like(y)
 
-    for k in range(51):
-        for i in range(5000):
-            solution[k] += erfc((1 - y[k] + (2 * i)) / (2 * np.sqrt(D * t))) - erfc(
-                (1 + y[k] + (2 * i)) / (2 * np.sqrt(D * t))
-            )
+@njit(cache=True)
+def sor_iterations(width, eps, omega, objects, max_iter):
+    """
+    Returns the number of SOR iterations, objects is ignored. This is the
+    solve function golden_section_omega expects.
+    """
+    return sor(width, eps, omega, max_iter)[1]
 
-    return solution
 
+# The omega searches are plain Python: each step is a whole (cached) solve,
+# and Numba cannot cache functions that get a jitted function as argument
+def count_iterations(solve, width, eps, omega_list, objects, iterations, index):
+    """
+    Returns the number of iterations for omega_list[index], solving only if
+    it was not evaluated before (iterations[index] < 0). The solve is stopped
+    as soon as it needs more iterations than the best omega so far.
+    """
+    if iterations[index] < 0:
+        best = 10000
+        for k in iterations:
+            if 0 <= k < best:
+                best = k
+        iterations[index] = solve(width, eps, omega_list[index], objects, best + 1)
+
+    return iterations[index]
 
-def optimal_omega(width, eps):
+
+def golden_section_omega(solve, width, eps, objects, omega_list):
+    """
+    Finds the omega in omega_list with the least number of iterations with a
+    golden section search over its indices, starting from the theoretical
+    optimum 2 / (1 + sin(pi / N)). solve(width, eps, omega, objects,
+    max_iter) must return the number of iterations.
+    """
+    n = len(omega_list)
+    iterations = -np.ones(n, dtype=np.int64)
+
+    # Start from the grid point nearest to the theoretical optimum
+    seed = 2 / (1 + np.sin(np.pi / width))
+    best = int(np.argmin(np.abs(omega_list - seed)))
+    count_iterations(solve, width, eps, omega_list, objects, iterations, best)
+
+    # The minimum lies in [low, high], try a point in the larger part
+    low = 0
+    high = n - 1
+    while high - low > 2:
+        if best - low > high - best:
+            index = best - max(1, int(round(0.381966 * (best - low))))
+        else:
+            index = best + max(1, int(round(0.381966 * (high - best))))
+
+        k = count_iterations(solve, width, eps, omega_list, objects, iterations, index)
+        if k < iterations[best]:
+            if index < best:
+                high = best
+            else:
+                low = best
+            best = index
+        elif index < best:
+            low = index
+        else:
+            high = index
+
+    # Check the few remaining points of the bracket
+    for index in range(low, high + 1):
+        k = count_iterations(solve, width, eps, omega_list, objects, iterations, index)
+        if k < iterations[best] or (k == iterations[best] and index < best):
+            best = index
+
+    # On a plateau return the first omega with the least iterations, like
+    # the grid search
+    while best > 0:
+        k = count_iterations(solve, width, eps, omega_list, objects, iterations, best - 1)
+        if k != iterations[best]:
+            break
+        best = best - 1
+
+    return omega_list[best]
+
+
+def optimal_omega(width, eps, search="grid"):
+    """
+    Returns the omega for which SOR needs the least iterations. With
+    search="grid" every omega is tried, with search="golden" a golden
+    section search is used.
+    """
     omega_list = np.arange(1.7, 1.999, 0.001)
+    if search == "golden":
+        return golden_section_omega(
+            sor_iterations, width, eps, np.zeros((1, 1)), omega_list
+        )
+
     num_iterations = []
 
     for omega in omega_list:
@@ -0,0 +1,140 @@
+"""
+Course: Scientific computing
+Names: Lisa Pijpers, Petr Chalupský and Tika van Bennekum
+Student IDs: 15746704, 15719227 and 13392425
+
+File description:
+    Runs the Laplace, objects and time dependent solvers in chunks of
+    iterations, leaving the compiled loop after each chunk to record the
+    wall time, the throughput and a residual checkpoint, and to call an
+    optional progress callback. The solvers themselves are not changed, so
+    the normal calls cost nothing extra.
+"""
+
+import time
+import numpy as np
+from scientific_computing.laplace import (
+    initialize_grid,
+    pad_grid,
+    jacobi_iterate,
+    sor_iterate,
+)
+from scientific_computing.add_object_SOR import sor_iterate_objects
+from scientific_computing.time_dep_diff import (
+    stability_factor,
+    integrate,
+    implicit_integrate,
+)
+
+
+def run_chunks(advance, cells, max_steps, every, callback=None):
+    """
+    Calls advance(k, stop), which does the steps from k up to at most stop
+    and returns (k, residual, done), in chunks of every steps until done or
+    max_steps is reached. After each chunk a checkpoint (steps, seconds,
+    residual) is stored and passed to the callback, if the callback returns
+    True the run stops there. Returns the statistics of the run, cells is
+    the number of cells updated per step.
+    """
+    checkpoints = []
+    start = time.perf_counter()
+    k = 0
+    done = False
+    while not done and k < max_steps:
+        k, residual, done = advance(k, min(k + every, max_steps))
+        checkpoint = (k, time.perf_counter() - start, residual)
+        checkpoints.append(checkpoint)
+        if callback is not None and callback(*checkpoint):
+            break
+
+    seconds = time.perf_counter() - start
+    return {
+        "steps": k,
+        "seconds": seconds,
+        "steps_per_second": k / seconds,
+        "cell_updates_per_second": k * cells / seconds,
+        "checkpoints": checkpoints,
+    }
+
+
+def monitored_jacobi(width, eps, every=100, callback=None, max_iter=10000):
+    """
+    Same as jacobi_iteration, with a checkpoint of delta every given number
+    of sweeps. Returns the final grid, number of iterations, the delta
+    values and the statistics of run_chunks, with the time per phase.
+    """
+    start = time.perf_counter()
+    buffers = np.empty((2, width, width + 2))
+    buffers[0] = pad_grid(initialize_grid(width))
+    buffers[1] = buffers[0]
+    delta_list = np.empty(max_iter)
+    setup = time.perf_counter() - start
+
+    def advance(k, stop):
+        k = jacobi_iterate(buffers, eps, delta_list, k, stop)
+        return k, delta_list[k - 1], delta_list[k - 1] < eps
+
+    stats = run_chunks(advance, (width - 2) * width, max_iter, every, callback)
+    k = stats["steps"]
+    stats["phases"] = {"setup": setup, "iterate": stats["seconds"]}
+
+    return buffers[k % 2, :, 1:-1].copy(), k, delta_list[:k], stats
+
+
+def monitored_sor(
+    width, eps, omega, objects=None, every=100, callback=None, max_iter=10000
+):
+    """
+    Same as sor, or as sor_with_objects if objects is given, with a
+    checkpoint of delta every given number of sweeps. Returns the final
+    grid, number of iterations, the delta values and the statistics of
+    run_chunks, with the time per phase.
+    """
+    start = time.perf_counter()
+    grid = pad_grid(initialize_grid(width))
+    delta_list = np.empty(max_iter)
+    setup = time.perf_counter() - start
+
+    def advance(k, stop):
+        if objects is None:
+            k = sor_iterate(grid, eps, omega, delta_list, k, stop)
+        else:
+            k = sor_iterate_objects(grid, eps, omega, objects, delta_list, k, stop)
+        return k, delta_list[k - 1], delta_list[k - 1] < eps
+
+    stats = run_chunks(advance, (width - 2) * width, max_iter, every, callback)
+    k = stats["steps"]
+    stats["phases"] = {"setup": setup, "iterate": stats["seconds"]}
+
+    return grid[:, 1:-1].copy(), k, delta_list[:k], stats
+
+
+def monitored_time_dep_diff(
+    width, D, dt, t, every=100, callback=None, scheme="explicit"
+):
+    """
+    Same as time_dep_diff, with a checkpoint every given number of time
+    steps. The residual of a checkpoint is the largest change of a cell
+    since the previous one. Returns the final grid and the statistics of
+    run_chunks, with the time per phase.
+    """
+    start = time.perf_counter()
+    steps = int(t / dt)
+    grid = initialize_grid(width)
+    if scheme == "explicit":
+        factor = stability_factor(width, D, dt)
+    setup = time.perf_counter() - start
+
+    def advance(k, stop):
+        nonlocal grid
+        previous = grid.copy()
+        if scheme == "explicit":
+            grid = integrate(grid, factor, stop - k)
+        else:
+            grid = implicit_integrate(grid, D, dt, stop - k, scheme, k == 0)
+        return stop, np.max(np.abs(grid - previous)), False
+
+    stats = run_chunks(advance, (width - 2) * width, steps, every, callback)
+    stats["phases"] = {"setup": setup, "iterate": stats["seconds"]}
+
+    return grid, stats
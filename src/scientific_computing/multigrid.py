@@ -0,0 +1,180 @@
+"""
+Course: Scientific computing
+Names: Lisa Pijpers, Petr Chalupský and Tika van Bennekum
+Student IDs: 15746704, 15719227 and 13392425
+
+File description:
+    Geometric multigrid solver (V-cycles started from a full multigrid pass)
+    for the steady state of the Laplace equation, optionally with objects.
+"""
+
+import numpy as np
+from numba import njit
+from scipy.sparse import csr_matrix, kron
+from scipy.sparse.linalg import splu
+from scientific_computing.laplace import (
+    initialize_grid,
+    assemble_laplacian,
+    boundary_rhs,
+)
+
+
+def interpolation_fixed(n):
+    """
+    Linear interpolation from n // 2 coarse points to n fine points between
+    two fixed boundaries. Coarse point c lies on fine point 2c + 1.
+    """
+    n_coarse = n // 2
+    rows, columns, values = [], [], []
+    for f in range(n):
+        if f % 2 == 1:
+            rows.append(f)
+            columns.append((f - 1) // 2)
+            values.append(1.0)
+        else:
+            # Neighbours outside the domain are on the boundary and add nothing
+            for neighbour in (f - 1, f + 1):
+                if 0 <= neighbour < n:
+                    rows.append(f)
+                    columns.append((neighbour - 1) // 2)
+                    values.append(0.5)
+
+    return csr_matrix((values, (rows, columns)), shape=(n, n_coarse))
+
+
+def interpolation_periodic(n):
+    """
+    Linear interpolation from (n + 1) // 2 coarse points to n fine points
+    with periodic boundaries. Coarse point c lies on fine point 2c.
+    """
+    n_coarse = (n + 1) // 2
+    rows, columns, values = [], [], []
+    for f in range(n):
+        if f % 2 == 0:
+            rows.append(f)
+            columns.append(f // 2)
+            values.append(1.0)
+        else:
+            rows += [f, f]
+            columns += [(f - 1) // 2, ((f + 1) // 2) % n_coarse]
+            values += [0.5, 0.5]
+
+    return csr_matrix((values, (rows, columns)), shape=(n, n_coarse))
+
+
+def build_hierarchy(width, objects=None, coarsest_size=100):
+    """
+    Builds the multigrid levels for a grid of the given width. The coarse
+    operators are the Galerkin products P^T A P, so cells covered by objects
+    are handled on every level. Returns the list of levels (dictionaries)
+    from fine to coarse and the free cell indices of the finest level.
+    """
+    A, free = assemble_laplacian(width, objects)
+    levels = [{"A": A}]
+    ny, nx = width - 2, width
+    keep = free
+
+    while A.shape[0] > coarsest_size and ny >= 3 and nx >= 4:
+        P = kron(interpolation_fixed(ny), interpolation_periodic(nx), format="csr")
+        P = P[keep, :]
+
+        # Coarse cells without any free fine cell are dropped
+        keep = np.flatnonzero(P.getnnz(axis=0))
+        P = P[:, keep].tocsr()
+
+        A = (P.T @ A @ P).tocsr()
+        levels[-1]["P"] = P
+        levels.append({"A": A})
+        ny, nx = ny // 2, (nx + 1) // 2
+
+    levels[-1]["lu"] = splu(levels[-1]["A"].tocsc())
+
+    return levels, free
+
+
+@njit(cache=True)
+def gauss_seidel_csr(indptr, indices, data, x, b, sweeps, backward):
+    """
+    Gauss-Seidel sweeps in place on a sparse matrix in CSR format, in
+    forward or backward row order.
+    """
+    n = len(x)
+    for sweep in range(sweeps):
+        for r in range(n):
+            row = n - 1 - r if backward else r
+            diagonal = 0.0
+            total = b[row]
+            for p in range(indptr[row], indptr[row + 1]):
+                if indices[p] == row:
+                    diagonal += data[p]
+                else:
+                    total -= data[p] * x[indices[p]]
+            x[row] = total / diagonal
+
+
+def v_cycle(levels, level, x, b, pre_sweeps=2, post_sweeps=2):
+    """
+    Applies one V-cycle in place to x for the system at the given level.
+    """
+    A = levels[level]["A"]
+    if level == len(levels) - 1:
+        x[:] = levels[level]["lu"].solve(b)
+        return
+
+    gauss_seidel_csr(A.indptr, A.indices, A.data, x, b, pre_sweeps, False)
+
+    # Coarse grid correction
+    P = levels[level]["P"]
+    residual_coarse = P.T @ (b - A @ x)
+    error_coarse = np.zeros(P.shape[1])
+    v_cycle(levels, level + 1, error_coarse, residual_coarse, pre_sweeps, post_sweeps)
+    x += P @ error_coarse
+
+    gauss_seidel_csr(A.indptr, A.indices, A.data, x, b, post_sweeps, True)
+
+
+def full_multigrid(levels, b, pre_sweeps=2, post_sweeps=2):
+    """
+    Full multigrid: solves on the coarsest level and interpolates the
+    solution up, applying one V-cycle on every finer level.
+    """
+    rhs = [b]
+    for level in levels[:-1]:
+        rhs.append(level["P"].T @ rhs[-1])
+
+    x = levels[-1]["lu"].solve(rhs[-1])
+    for level in range(len(levels) - 2, -1, -1):
+        x = levels[level]["P"] @ x
+        v_cycle(levels, level, x, rhs[level], pre_sweeps, post_sweeps)
+
+    return x
+
+
+def multigrid(width, eps, objects=None, pre_sweeps=2, post_sweeps=2, max_iter=100):
+    """
+    Solves the steady state with multigrid. The first iteration is a full
+    multigrid pass, after which V-cycles are applied until the largest change
+    of a cell is smaller than eps. Objects is an optional grid as returned
+    by create_objects. Returns final grid, number of iterations and the list
+    of delta values, like sor.
+    """
+    levels, free = build_hierarchy(width, objects)
+    b = boundary_rhs(width, free)
+
+    grid = initialize_grid(width)
+    interior = grid[1:-1].reshape(-1)
+
+    x = full_multigrid(levels, b, pre_sweeps, post_sweeps)
+    delta = np.max(np.abs(x - interior[free]), initial=0)
+    delta_list = [delta]
+    k = 1
+    while delta >= eps and k < max_iter:
+        x_old = x.copy()
+        v_cycle(levels, 0, x, b, pre_sweeps, post_sweeps)
+        delta = np.max(np.abs(x - x_old), initial=0)
+        delta_list.append(delta)
+        k = k + 1
+
+    interior[free] = x
+
+    return grid, k, delta_list
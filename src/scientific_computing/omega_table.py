@@ -0,0 +1,240 @@
+"""
+Course: Scientific computing
+Names: Lisa Pijpers, Petr Chalupský and Tika van Bennekum
+Student IDs: 15746704, 15719227 and 13392425
+
+File description:
+    Lookup table of the optimal SOR omega for the grid width N, the fraction
+    of the grid covered by objects and the number of objects. The table is
+    built once with the golden section search and stored as JSON, after
+    which omega is found by interpolation instead of new solves. Run from
+    the root of the repository to add the missing entries with:
+        python -m scientific_computing.omega_table --sizes 25 50 100
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
+from scientific_computing.sweep import search_omega
+
+# Location of the table and version of its format
+table_file = os.environ.get("SCIENTIFIC_COMPUTING_OMEGA_TABLE", "data/omega_table.json")
+table_version = 1
+
+
+def object_layout(N, fraction, count):
+    """
+    Returns count square objects (row start, row end, column start, column
+    end) covering together about the given fraction of the grid, placed in
+    the middle of the cells of an evenly spaced lattice. Returns None if
+    there are no objects. Raises a ValueError if the objects do not fit in
+    the cells of the lattice, since they would overlap or be cut off and
+    cover less than the fraction.
+    """
+    if fraction == 0 or count == 0:
+        return None
+    if not 0 < fraction < 1:
+        raise ValueError("The fraction must be between 0 and 1")
+
+    side = max(1, int(round(N * np.sqrt(fraction / count))))
+    columns = int(np.ceil(np.sqrt(count)))
+    rows = int(np.ceil(count / columns))
+    if side > N // columns or side > (N - 2) // rows:
+        raise ValueError(
+            f"{count} objects covering {fraction} of a grid of width {N} do not fit"
+        )
+
+    list_objects = np.empty((count, 4), dtype=np.int64)
+    for c in range(count):
+        row, column = divmod(c, columns)
+
+        # Keep the objects off the fixed upper and lower rows
+        row_start = int((row + 0.5) * N / rows - side / 2)
+        row_start = min(max(row_start, 1), N - 1 - side)
+        column_start = int((column + 0.5) * N / columns - side / 2)
+        list_objects[c] = [
+            row_start,
+            row_start + side,
+            column_start,
+            column_start + side,
+        ]
+
+    return list_objects
+
+
+def entry_key(N, fraction, count):
+    """
+    Returns the key of an entry. A grid without objects (fraction or count
+    0) has a single key with fraction 0 and count 0.
+    """
+    if fraction == 0 or count == 0:
+        return int(N), 0.0, 0
+
+    return int(N), float(fraction), int(count)
+
+
+def empty_table(eps):
+    """
+    Returns a table without entries for the given eps.
+    """
+    return {"version": table_version, "eps": eps, "entries": []}
+
+
+def load_table(path=table_file):
+    """
+    Returns the table stored at path, or None if there is none.
+    """
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        table = json.load(f)
+    if table.get("version") != table_version:
+        raise ValueError(f"{path} has version {table.get('version')}")
+
+    return table
+
+
+def save_table(table, path=table_file):
+    """
+    Writes the table to path, replacing the old file only once the new one
+    is complete.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(table, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def refresh_table(
+    list_N, fractions, counts, eps=0.00001, path=table_file, processes=None
+):
+    """
+    Adds the optimal omega of every combination of N, fraction and count
+    that is not in the table at path yet, computed in parallel with the
+    golden section search, and saves the table. A table with another eps
+    is started over. Returns the table and the number of new entries.
+    """
+    table = load_table(path)
+    if table is None or table["eps"] != eps:
+        table = empty_table(eps)
+
+    done = {entry_key(e["N"], e["fraction"], e["count"]) for e in table["entries"]}
+    missing = []
+    for N in sorted(list_N, reverse=True):
+        for fraction in fractions:
+            for count in counts:
+                key = entry_key(N, fraction, count)
+                if key not in done and key not in missing:
+                    missing.append(key)
+    if not missing:
+        return table, 0
+
+    # Forked workers can deadlock on the Numba threading layer
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        futures = [
+            executor.submit(search_omega, N, eps, object_layout(N, fraction, count))
+            for N, fraction, count in missing
+        ]
+        for (N, fraction, count), future in zip(missing, futures):
+            table["entries"].append(
+                {
+                    "N": N,
+                    "fraction": fraction,
+                    "count": count,
+                    "omega": float(future.result()),
+                }
+            )
+
+    save_table(table, path)
+    return table, len(missing)
+
+
+def build_index(table):
+    """
+    Returns for every object count the sorted fractions and for each
+    fraction the arrays of 1 / N (increasing) and omega. The entries without
+    objects are under count 0 and are the fraction 0 of every count.
+    """
+    curves = {}
+    no_objects = {}
+    for e in table["entries"]:
+        N, fraction, count = entry_key(e["N"], e["fraction"], e["count"])
+        if count == 0:
+            no_objects[1 / N] = e["omega"]
+        else:
+            curves.setdefault(count, {}).setdefault(fraction, {})[1 / N] = e["omega"]
+
+    if no_objects:
+        curves[0] = {}
+        for by_fraction in curves.values():
+            by_fraction[0.0] = no_objects
+
+    index = {}
+    for count, by_fraction in curves.items():
+        fractions = sorted(by_fraction)
+        index[count] = (np.array(fractions), [])
+        for fraction in fractions:
+            inverse_N = sorted(by_fraction[fraction])
+            omega = [by_fraction[fraction][x] for x in inverse_N]
+            index[count][1].append((np.array(inverse_N), np.array(omega)))
+
+    return index
+
+
+@lru_cache(maxsize=4)
+def cached_index(path, mtime):
+    """
+    Returns the index of the table at path, the modification time makes
+    sure a refreshed table is loaded again.
+    """
+    table = load_table(path)
+    if table is None:
+        raise FileNotFoundError(f"No omega table at {path}")
+
+    return build_index(table)
+
+
+def lookup_omega(N, fraction=0.0, count=0, path=table_file):
+    """
+    Returns the optimal omega for a grid of width N with objects covering
+    the given fraction, interpolated linearly in 1 / N and in the fraction
+    for the nearest object count in the table. Without objects (fraction or
+    count 0) the entries without objects are used. Outside the range of the
+    table the nearest value is used.
+    """
+    index = cached_index(path, os.stat(path).st_mtime_ns)
+    fraction, count = entry_key(N, fraction, count)[1:]
+
+    # Grids with objects use the nearest count that has objects
+    counts = [c for c in index if (c == 0) == (count == 0)] or list(index)
+    nearest = counts[int(np.argmin([abs(c - count) for c in counts]))]
+
+    fractions, curves = index[nearest]
+    omegas = [np.interp(1 / N, inverse_N, omega) for inverse_N, omega in curves]
+    return float(np.interp(fraction, fractions, omegas))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Adds the missing entries to the optimal omega table."
+    )
+    parser.add_argument("--sizes", nargs="+", type=int, default=[25, 50, 75, 100])
+    parser.add_argument(
+        "--fractions", nargs="+", type=float, default=[0, 0.05, 0.1, 0.2, 0.3]
+    )
+    parser.add_argument("--counts", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--eps", type=float, default=0.00001)
+    parser.add_argument("--file", default=table_file)
+    parser.add_argument("--processes", type=int)
+    args = parser.parse_args()
+
+    table, added = refresh_table(
+        args.sizes, args.fractions, args.counts, args.eps, args.file, args.processes
+    )
+    print(f"Added {added} entries, {len(table['entries'])} in {args.file}")
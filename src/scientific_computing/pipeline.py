@@ -0,0 +1,258 @@
+"""
+Course: Scientific computing
+Names: Lisa Pijpers, Petr Chalupský and Tika van Bennekum
+Student IDs: 15746704, 15719227 and 13392425
+
+File description:
+    Runs all scripts of the analysis. Every stage knows the files it reads
+    and writes, independent stages run at the same time and stages whose
+    code and inputs did not change since the last run are skipped.
+    Run from the root of the repository with:
+        python -m scientific_computing.pipeline
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+state_file = "data/.pipeline_state.json"
+package_dir = os.path.dirname(os.path.abspath(__file__))
+
+times = ["0", "0.001", "0.01", "0.1", "1"]
+laplace_data = [
+    f"data/{method}_{quantity}.npy"
+    for method in ["jacobi", "gauss_seidel"]
+    for quantity in ["grid", "k", "delta"]
+] + [
+    f"data/sor_{quantity}_{omega}.npy"
+    for omega in ["171", "181", "191"]
+    for quantity in ["grid", "k", "delta"]
+]
+omega_data = [
+    "data/list_omega.npy",
+    "data/list_omega_object1.npy",
+    "data/list_omega_object2.npy",
+]
+steady_data = [
+    "data/grid_no_object_steady.npy",
+    "data/grid_object1_steady.npy",
+    "data/grid_object2_steady.npy",
+]
+string_data = ["data/string_1.npy", "data/string_2.npy", "data/string_3.npy"]
+time_dep_diff_data = [f"data/time_dep_diff_{t}.npy" for t in times] + [
+    f"data/time_dep_diff_analy_{t}.npy" for t in times[1:]
+]
+
+# Script, files it reads and files it writes for every stage
+stages = {
+    "heatmap_objects": {
+        "script": "scripts/heatmap_objects.py",
+        "inputs": [],
+        "outputs": steady_data + ["data/primitive_insulation_steady.npy"],
+    },
+    "objects_omega": {
+        "script": "scripts/objects_omega.py",
+        "inputs": [],
+        "outputs": omega_data,
+    },
+    "calculate_vibrating_string": {
+        "script": "scripts/calculate_vibrating_string.py",
+        "inputs": [],
+        "outputs": string_data + ["results/animate_string.gif"],
+    },
+    "calculate_laplace": {
+        "script": "scripts/calculate_laplace.py",
+        "inputs": [],
+        "outputs": laplace_data + ["data/list_omega_laplace.npy", "data/list_N.npy"],
+    },
+    "calculate_time_dep_diff": {
+        "script": "scripts/calculate_time_dep_diff.py",
+        "inputs": [],
+        "outputs": time_dep_diff_data,
+    },
+    "visualize_heatmap_insulation": {
+        "script": "scripts/visualize_heatmap_insulation.py",
+        "inputs": ["data/primitive_insulation_steady.npy"],
+        "outputs": ["results/heatmap_primitive_insulation.png"],
+    },
+    "visualize_heatmap_objects": {
+        "script": "scripts/visualize_heatmap_objects.py",
+        "inputs": steady_data,
+        "outputs": ["results/heatmap_objects.png"],
+    },
+    "visualize_Laplace": {
+        "script": "scripts/visualize_Laplace.py",
+        "inputs": laplace_data + ["data/list_omega_laplace.npy", "data/list_N.npy"],
+        "outputs": [
+            "results/iteration_methods_comparison.png",
+            "results/iteration_methods_delta_comparison.png",
+            "results/sor_optimal_omega.png",
+        ],
+    },
+    "visualize_objects": {
+        "script": "scripts/visualize_objects.py",
+        "inputs": omega_data,
+        "outputs": ["results/sor_with_objects_optimal_omega.png"],
+    },
+    "visualize_time_dep_diff": {
+        "script": "scripts/visualize_time_dep_diff.py",
+        "inputs": time_dep_diff_data,
+        "outputs": [
+            "results/time_dep_diff_comparison_1.png",
+            "results/time_dep_diff_heatmaps.png",
+            "results/time_dep_diff_animation.gif",
+        ],
+    },
+    "visualize_vibrating_string": {
+        "script": "scripts/visualize_vibrating_string.py",
+        "inputs": string_data,
+        "outputs": ["results/vibrating_string.png"],
+    },
+}
+
+
+def dependencies(stages):
+    """
+    Returns for every stage the stages that write its inputs.
+    """
+    writer = {}
+    for name, stage in stages.items():
+        for output in stage["outputs"]:
+            writer[output] = name
+
+    return {
+        name: {writer[i] for i in stage["inputs"] if i in writer}
+        for name, stage in stages.items()
+    }
+
+
+def source_files(script):
+    """
+    Returns the script and the modules of this package it imports, directly
+    or indirectly.
+    """
+    files = []
+    todo = [script]
+    while todo:
+        path = todo.pop()
+        if path in files or not os.path.exists(path):
+            continue
+        files.append(path)
+        with open(path) as f:
+            source = f.read()
+        for module in re.findall(r"scientific_computing\.(\w+)", source):
+            todo.append(os.path.join(package_dir, module + ".py"))
+        for module in re.findall(r"from scientific_computing import (\w+)", source):
+            todo.append(os.path.join(package_dir, module + ".py"))
+
+    return sorted(files)
+
+
+def fingerprint(stage):
+    """
+    Returns a hash of the code a stage runs and the files it reads.
+    """
+    digest = hashlib.sha256()
+    for path in source_files(stage["script"]) + stage["inputs"]:
+        digest.update(path.encode())
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def run_stage(stage):
+    """
+    Runs the script of a stage in a new Python process. Returns the exit
+    code, the output and the duration.
+    """
+    start = time.time()
+    process = subprocess.run(
+        [sys.executable, stage["script"]],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+
+    return process.returncode, process.stdout, time.time() - start
+
+
+def run_pipeline(stages=stages, jobs=None, force=False):
+    """
+    Runs the stages in dependency order, with at most jobs stages at the
+    same time. Stages whose fingerprint and outputs are unchanged since the
+    last run are skipped, unless force is True. Returns True if all stages
+    succeeded.
+    """
+    state = {}
+    if os.path.exists(state_file) and not force:
+        with open(state_file) as f:
+            state = json.load(f)
+
+    waiting = dependencies(stages)
+    running = {}
+    done = set()
+    failed = set()
+
+    # Every stage runs in its own process, the threads only wait for them
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        while waiting or running:
+            for name in [n for n, deps in waiting.items() if deps <= done]:
+                del waiting[name]
+                stage = stages[name]
+                stage_fingerprint = fingerprint(stage)
+                outputs_exist = all(os.path.exists(o) for o in stage["outputs"])
+                if state.get(name) == stage_fingerprint and outputs_exist:
+                    print(f"Skipping {name} (up to date)")
+                    done.add(name)
+                    continue
+
+                print(f"Running {name}")
+                future = executor.submit(run_stage, stage)
+                running[future] = (name, stage_fingerprint)
+
+            # Stages that depend on a failed stage are not run
+            for name in [n for n, deps in waiting.items() if deps & failed]:
+                del waiting[name]
+                failed.add(name)
+                print(f"Not running {name}, a stage it depends on failed")
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, stage_fingerprint = running.pop(future)
+                returncode, output, duration = future.result()
+                if output:
+                    print(output, end="")
+                if returncode == 0:
+                    print(f"Finished {name} in {duration:.1f} s")
+                    state[name] = stage_fingerprint
+                    done.add(name)
+                else:
+                    print(f"Failed {name} with exit code {returncode}")
+                    state.pop(name, None)
+                    failed.add(name)
+
+                os.makedirs(os.path.dirname(state_file), exist_ok=True)
+                with open(state_file, "w") as f:
+                    json.dump(state, f, indent=2)
+
+    return not failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the analysis pipeline.")
+    parser.add_argument("--jobs", type=int, help="stages to run at the same time")
+    parser.add_argument("--force", action="store_true", help="run all stages")
+    args = parser.parse_args()
+
+    sys.exit(0 if run_pipeline(jobs=args.jobs, force=args.force) else 1)
@@ -0,0 +1,44 @@
+"""
+Course: Scientific computing
+Names: Lisa Pijpers, Petr Chalupský and Tika van Bennekum
+Student IDs: 15746704, 15719227 and 13392425
+
+File description:
+    Plots and animates the vibrating string. Kept apart from the solvers so
+    that importing them does not load matplotlib.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.animation as animation
+
+
+def plot_vibrating_string(u, L, t):
+    """Plots the solution of 1D wave equation for a string"""
+    plt.imshow(u, extent=[0, L, t, 0])
+    plt.xlabel("x")
+    plt.ylabel("Time")
+    plt.colorbar(label="Amplitude")
+
+    plt.savefig("results/vibrating_string")
+
+
+def animate_string(u, x):
+    """Animates the solution of 1D wave equation for a string"""
+    fig, ax = plt.subplots()
+    (line,) = ax.plot([], [])
+    ax.set_xlim(min(x), max(x))
+    ax.set_ylim(np.min(u), np.max(u))
+    ax.set_xlabel("x")
+    ax.set_ylabel("Time")
+
+    def update(frame):
+        line.set_data(x, u[frame, :])
+        return [line]
+
+    anim = animation.FuncAnimation(
+        fig=fig, func=update, frames=u.shape[0], interval=30, blit=True
+    )
+
+    anim.save("results/animate_string.gif")
+    return anim
@@ -0,0 +1,128 @@
+"""
+Course: Scientific computing
+Names: Lisa Pijpers, Petr Chalupský and Tika van Bennekum
+Student IDs: 15746704, 15719227 and 13392425
+
+File description:
+    Solves the steady state of the Laplace equation (with objects) as one
+    sparse linear system, with a direct solver or preconditioned conjugate
+    gradients. The factorization or preconditioner is cached per geometry.
+"""
+
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from scipy.sparse.linalg import splu, cg, LinearOperator
+from scientific_computing.laplace import assemble_laplacian, boundary_rhs
+from scientific_computing.multigrid import build_hierarchy, v_cycle
+
+# Cached solvers, the least recently used one is removed when full
+solver_cache = OrderedDict()
+cache_size = 32
+
+
+def mask_hash(objects):
+    """
+    Returns a hash of the cells that are covered by an object.
+    """
+    if objects is None:
+        return None
+
+    mask = np.packbits(np.asarray(objects)[1:-1] == 1)
+    return hashlib.sha1(mask.tobytes()).hexdigest()
+
+
+def get_solver(width, objects, method):
+    """
+    Returns the cached solver for this width, object mask and method, or
+    builds it. For method="direct" this is the sparse LU factorization, for
+    method="cg" the matrix with a multigrid V-cycle as preconditioner.
+    """
+    key = (width, mask_hash(objects), method)
+    if key in solver_cache:
+        solver_cache.move_to_end(key)
+        return solver_cache[key]
+
+    if method == "direct":
+        A, free = assemble_laplacian(width, objects)
+        solver = {"free": free, "lu": splu(A.tocsc())}
+    elif method == "cg":
+        levels, free = build_hierarchy(width, objects)
+
+        def precondition(r):
+            x = np.zeros(len(r))
+            v_cycle(levels, 0, x, np.ravel(r))
+            return x
+
+        n = len(free)
+        solver = {
+            "free": free,
+            "A": levels[0]["A"],
+            "M": LinearOperator((n, n), matvec=precondition, dtype=np.float64),
+        }
+    else:
+        raise ValueError(f"Unknown method {method}")
+
+    solver_cache[key] = solver
+    if len(solver_cache) > cache_size:
+        solver_cache.popitem(last=False)
+
+    return solver
+
+
+def sparse_steady_state(
+    width,
+    eps=1e-10,
+    objects=None,
+    method="direct",
+    top=1.0,
+    bottom=0.0,
+    max_iter=10000,
+):
+    """
+    Solves the steady state for the given values of the upper and lower row
+    (scalars or arrays of length width) and optional objects. For
+    method="cg", eps is the relative residual at which conjugate gradients
+    stops, a RuntimeError is raised if it does not get there within
+    max_iter iterations. Returns final grid, number of iterations and the
+    list of delta values, like sor. A direct solve counts as one iteration.
+    """
+    solver = get_solver(width, objects, method)
+    free = solver["free"]
+    b = boundary_rhs(width, free, top, bottom)
+
+    grid = np.zeros((width, width))
+    grid[0, :] = bottom
+    grid[width - 1, :] = top
+    interior = grid[1:-1].reshape(-1)
+
+    if method == "direct":
+        x = solver["lu"].solve(b)
+        delta_list = [np.max(np.abs(x), initial=0)]
+    else:
+        # The change of the solution in every iteration gives delta
+        delta_list = []
+        previous = [np.zeros(len(free))]
+
+        def track(xk):
+            delta_list.append(np.max(np.abs(xk - previous[0]), initial=0))
+            previous[0] = xk.copy()
+
+        x, info = cg(
+            solver["A"],
+            b,
+            rtol=eps,
+            atol=0,
+            maxiter=max_iter,
+            M=solver["M"],
+            callback=track,
+        )
+        if info != 0:
+            raise RuntimeError(
+                f"Conjugate gradients did not reach eps={eps} in {len(delta_list)}"
+                " iterations"
+            )
+
+    interior[free] = x
+
+    return grid, len(delta_list), delta_list
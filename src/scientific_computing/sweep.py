@@ -0,0 +1,95 @@
+"""
+Course: Scientific computing
+Names: Lisa Pijpers, Petr Chalupský and Tika van Bennekum
+Student IDs: 15746704, 15719227 and 13392425
+
+File description:
+    Computes the optimal omega for multiple grid sizes and (sets of) objects
+    in parallel over a pool of processes.
+"""
+
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scientific_computing.laplace import sor
+from scientific_computing.add_object_SOR import (
+    create_objects,
+    sor_with_objects,
+    optimal_omega,
+    optimal_omega_objects,
+)
+
+
+def solve_iterations(N, eps, omega, list_objects):
+    """
+    Returns the number of SOR iterations for one grid size, omega and set of
+    objects. If list_objects is None the grid has no objects.
+    """
+    if list_objects is None:
+        return sor(N, eps, omega)[1]
+
+    objects = create_objects(list_objects, N)
+    return sor_with_objects(N, eps, omega, objects)[1]
+
+
+def search_omega(N, eps, list_objects):
+    """
+    Returns the optimal omega for one grid size and set of objects found with
+    the golden section search.
+    """
+    if list_objects is None:
+        return optimal_omega(N, eps, "golden")
+
+    objects = create_objects(list_objects, N)
+    return optimal_omega_objects(N, eps, objects, "golden")
+
+
+def parallel_optimal_omega(eps, list_N, object_sets, search="grid", processes=None):
+    """
+    Returns for each set of objects in object_sets the list of optimal omegas
+    for the grid sizes in list_N, like calculate_optimal_omega_objects. None
+    in object_sets means a grid without objects.
+
+    With search="grid" every (N, omega, set of objects) solve is a separate
+    task, with search="golden" every (N, set of objects) search is one task.
+    Since the cost of a solve grows quickly with N, the tasks are submitted
+    largest N first so that the pool stays busy until the end.
+    """
+    omega_list = np.arange(1.5, 1.999, 0.001)
+    order = np.argsort(list_N)[::-1]
+
+    # Forking a process that already started the Numba threading layer can
+    # deadlock the workers, so they are started fresh
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        if search == "golden":
+            futures = {}
+            for n in order:
+                for s, list_objects in enumerate(object_sets):
+                    futures[s, n] = executor.submit(
+                        search_omega, int(list_N[n]), eps, list_objects
+                    )
+
+            return [
+                [futures[s, n].result() for n in range(len(list_N))]
+                for s in range(len(object_sets))
+            ]
+
+        futures = {}
+        for n in order:
+            for s, list_objects in enumerate(object_sets):
+                for o, omega in enumerate(omega_list):
+                    futures[s, n, o] = executor.submit(
+                        solve_iterations, int(list_N[n]), eps, omega, list_objects
+                    )
+
+        list_omega = []
+        for s in range(len(object_sets)):
+            list_omega.append([])
+            for n in range(len(list_N)):
+                num_iterations = [
+                    futures[s, n, o].result() for o in range(len(omega_list))
+                ]
+                list_omega[s].append(omega_list[np.argmin(num_iterations)])
+
+    return list_omega
@@ -8,17 +8,25 @@ File description:
 """
 
 import numpy as np
-from matplotlib.animation import FuncAnimation
-from scipy.special import erfc
+from functools import lru_cache
+from scipy.sparse import identity
+from scipy.sparse.linalg import splu
+from numba import njit, prange, set_num_threads
+from scientific_computing import analytical
+from scientific_computing.laplace import assemble_laplacian, boundary_rhs
 
+# Weight of the new time level for each implicit scheme
+implicit_schemes = {"backward-euler": 1.0, "crank-nicolson": 0.5}
 
-def initialize_grid(width):
+
+@njit(cache=True)
+def initialize_grid(width, dtype=np.float64):
     """
     Initialize grid given a width as parameter. It assumes a square grid.
     The upper row is equal to 1. The rest of the grid is equal to 0.
     """
     # Set empty grid
-    c = np.zeros((width, width))
+    c = np.zeros((width, width), dtype=dtype)
 
     # Set upper and lower boundary conditions
     c[width - 1, :] = 1
@@ -26,7 +34,50 @@ def initialize_grid(width):
     return c
 
 
-# @njit
+@njit(parallel=True, cache=True)
+def diffusion_step(grid, new_grid, factor):
+    """
+    Writes one step of the explicit scheme from grid into new_grid, without
+    allocating. The rows are computed in parallel. The upper and lower row
+    are not touched, so both grids must contain the boundary conditions.
+    """
+    width = grid.shape[1]
+
+    factor = grid.dtype.type(factor)
+    four = grid.dtype.type(4)
+
+    for i in prange(1, grid.shape[0] - 1):
+        for j in range(width):
+            # Periodic neighbours in x
+            left = j - 1 if j > 0 else width - 1
+            right = j + 1 if j < width - 1 else 0
+            new_grid[i, j] = grid[i, j] + factor * (
+                grid[i + 1, j]
+                + grid[i - 1, j]
+                + grid[i, left]
+                + grid[i, right]
+                - four * grid[i, j]
+            )
+
+
+# integrate and update_grid call a parallel kernel, so they are not cached,
+# see laplace.red_black_iterate
+@njit
+def integrate(grid, factor, steps):
+    """
+    Applies the explicit scheme for the given number of steps, swapping
+    between two preallocated grids. Returns the final grid, the input grid
+    may be overwritten.
+    """
+    new_grid = grid.copy()
+    for step in range(steps):
+        diffusion_step(grid, new_grid, factor)
+        grid, new_grid = new_grid, grid
+
+    return grid
+
+
+@njit
 def update_grid(width, dt, grid, D):
     """
     Updates grid according to explicit scheme derived from the
@@ -39,25 +90,15 @@ def update_grid(width, dt, grid, D):
 
     # Make a copy of the grid so that it does not overwrite the old grid
     new_grid = grid.copy()
-
-    # For each cell calculate new value with the explicit scheme.
-    for i in range(1, width - 1):
-        for j in range(width):
-            new_grid[i, j] = grid[i, j] + factor * (
-                grid[(i + 1) % (width), j]
-                + grid[(i - 1) % (width), j]
-                + grid[i, (j - 1) % (width)]
-                + grid[i, (j + 1) % (width)]
-                - 4 * grid[i, j]
-            )
+    diffusion_step(grid, new_grid, factor)
 
     return new_grid
 
 
-def time_dep_diff(width, D, dt, t):
+def stability_factor(width, D, dt):
     """
-    Given the input makes an initial grid and updates this
-    for a given time. Returns final grid.
+    Returns the factor dt * D / dx^2 of the explicit scheme and raises an
+    error if the scheme is not stable.
     """
     dx = 1 / width
 
@@ -65,37 +106,132 @@ def time_dep_diff(width, D, dt, t):
     if 4 * dt * D / dx**2 > 1:
         raise ValueError("The scheme is not stable")
 
+    return dt * D / dx**2
+
+
+@lru_cache(maxsize=16)
+def implicit_factorization(width, dt, D, theta):
+    """
+    Returns the LU factorization of the implicit part of the theta scheme
+    (theta=1 is backward Euler, theta=0.5 Crank-Nicolson), the matrix of the
+    explicit part and the constant contribution of the boundaries. The result
+    is cached, so it is computed once per (width, dt, D, theta).
+    """
+    dx = 1 / width
+    factor = dt * D / dx**2
+
+    A, free = assemble_laplacian(width)
+    I = identity(A.shape[0], format="csr")
+    lu = splu((I + theta * factor * A).tocsc())
+    explicit = (I - (1 - theta) * factor * A).tocsr()
+
+    return lu, explicit, factor * boundary_rhs(width, free)
+
+
+def implicit_integrate(grid, D, dt, steps, scheme, start=True):
+    """
+    Applies the given implicit scheme in place to the grid for the given
+    number of steps. These schemes are stable for every dt. Returns the grid.
+    If start is True the grid is the initial condition, then Crank-Nicolson
+    replaces its first step by two backward Euler half steps, since it would
+    otherwise keep oscillating near the jump at the upper row for large dt.
+    """
+    if scheme not in implicit_schemes:
+        raise ValueError(f"Unknown scheme {scheme}")
+
+    width = grid.shape[1]
+    interior = grid[1:-1].reshape(-1)
+
+    if start and scheme == "crank-nicolson" and steps > 0:
+        lu, explicit, boundaries = implicit_factorization(width, dt / 2, D, 1.0)
+        for half_step in range(2):
+            interior[:] = lu.solve(explicit @ interior + boundaries)
+        steps = steps - 1
+
+    lu, explicit, boundaries = implicit_factorization(
+        width, dt, D, implicit_schemes[scheme]
+    )
+    for step in range(steps):
+        interior[:] = lu.solve(explicit @ interior + boundaries)
+
+    return grid
+
+
+def time_dep_diff(width, D, dt, t, num_threads=0, scheme="explicit", dtype=np.float64):
+    """
+    Given the input makes an initial grid and updates this
+    for a given time. Returns final grid. If num_threads is larger than 0
+    it sets the number of threads Numba uses. Scheme is "explicit",
+    "backward-euler" or "crank-nicolson", the last two allow any dt. The
+    grid has the floating point type dtype.
+    """
     # Number of timesteps
     steps = int(t / dt)
 
     # Initialize the grid
-    grid = initialize_grid(width)
+    grid = initialize_grid(width, dtype)
+
+    if scheme != "explicit":
+        return implicit_integrate(grid, D, dt, steps, scheme)
+
+    factor = stability_factor(width, D, dt)
+
+    if num_threads > 0:
+        set_num_threads(num_threads)
 
     # Update the grid for calculated amount of steps
-    step = 0
+    return integrate(grid, factor, steps)
 
-    for step in range(steps):
-        grid = update_grid(width, dt, grid, D)
-        step = step + 1
 
-    return grid
+def iterate_time_dep_diff(
+    width, D, dt, times, num_threads=0, scheme="explicit", dtype=np.float64
+):
+    """
+    Integrates once from t=0 and yields the grid at each of the given
+    times, which must be increasing. Each grid is the same as the one
+    time_dep_diff returns for that time.
+    """
+    if scheme == "explicit":
+        factor = stability_factor(width, D, dt)
+
+    if num_threads > 0:
+        set_num_threads(num_threads)
+
+    grid = initialize_grid(width, dtype)
+    steps_done = 0
+    for t in times:
+        steps = int(t / dt)
+        if steps < steps_done:
+            raise ValueError("The times must be increasing")
+
+        if scheme == "explicit":
+            grid = integrate(grid, factor, steps - steps_done)
+        else:
+            grid = implicit_integrate(
+                grid, D, dt, steps - steps_done, scheme, steps_done == 0
+            )
+        steps_done = steps
+        yield grid.copy()
 
 
-def analytical_solution(D, t):
+def time_dep_diff_snapshots(
+    width, D, dt, times, num_threads=0, scheme="explicit", dtype=np.float64
+):
     """
-    Calculates analytical solution of time dependent diffusion equation
-    assuming y between 0 and 1.
+    Returns an array with the grid at each of the given times, computed in a
+    single pass.
     """
+    snapshots = np.empty((len(times), width, width), dtype=dtype)
+    grids = iterate_time_dep_diff(width, D, dt, times, num_threads, scheme, dtype)
+    for i, grid in enumerate(grids):
+        snapshots[i] = grid
 
-    y = np.linspace(0, 1, 50)
-    solution = np.zeros_like(y)
+    return snapshots
 
-    i_values = np.linspace(0, 10000, 10001)
-    sqrt_term = 2 * np.sqrt(D * t)
 
-    for k in range(50):
-        solution[k] = np.sum(
-            erfc((1 - y[k] + 2 * i_values) / sqrt_term)
-            - erfc((1 + y[k] + 2 * i_values) / sqrt_term)
-        )
-    return solution
+def analytical_solution(D, t):
+    """
+    Calculates analytical solution of time dependent diffusion equation
+    assuming y between 0 and 1.
+    """
+    return analytical.analytical_solution(D, t, 50)
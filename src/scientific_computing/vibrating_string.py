@@ -9,11 +9,37 @@ File description:
 
 import numpy as np
 from math import pi
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
+from numba import njit
+from scipy.fft import dst, idst
 
 
-def solve_vibrating_string(dx, dt, L=1, t=1, c=1, a=5, piecew=False):
+def initial_condition(x, a, piecew):
+    """Returns the initial displacement of the string at the positions x
+
+    Args:
+        x (1D array): Positions along the string
+        a (float or 1D array): Parameter to scale the argument of an IC
+        function
+        piecew (boolean or 1D array): If True, chooses piecewise initial
+        condition instead of pure sin function
+    Returns:
+        u0 (1D or 2D array): The initial displacement, with one row per
+        value of a and piecew if these are arrays
+    """
+    a = np.asarray(a, dtype=np.float64)[..., None]
+    piecew = np.asarray(piecew, dtype=bool)[..., None]
+
+    # The piecewise condition is zero outside 1/5 < x < 2/5
+    outside = (x <= 1 / 5) | (x >= 2 / 5)
+    u0 = np.where(piecew & outside, 0.0, np.sin(a * pi * x))
+
+    if np.any(u0[..., 0] > 0.0001) or np.any(u0[..., -1] > 0.0001):
+        print("Boundary conditions not fulfilled")
+
+    return u0
+
+
+def solve_vibrating_string(dx, dt, L=1, t=1, c=1, a=5, piecew=False, dtype=np.float64):
     """Solves the wave equation for a 1D string
 
     Args:
@@ -25,6 +51,7 @@ def solve_vibrating_string(dx, dt, L=1, t=1, c=1, a=5, piecew=False):
         a (float): Parameter to scale the argument of an IC function
         piecew (boolean): If True, chooses piecewise initial condition instead
         of pure sin function
+        dtype (data type): Floating point type of the solution
     Returns:
         u (2D array): The spatio-temporal solution of the 1D equation
     """
@@ -32,20 +59,10 @@ def solve_vibrating_string(dx, dt, L=1, t=1, c=1, a=5, piecew=False):
     nx = int(L / dx + 1)  # number of columns
     nt = int(t / dt + 1)  # number of rows
     x = np.linspace(0, L, nx)
-    u = np.zeros((nt, nx))
+    u = np.zeros((nt, nx), dtype=dtype)
 
     # ICs
-    if piecew == False:
-        u[0, :] = np.sin(a * pi * x)
-    else:
-        for i, position in enumerate(x):
-            if 1 / 5 < position < 2 / 5:
-                u[0, i] = np.sin(a * pi * position)
-            else:
-                u[0, i] = 0
-
-    if u[0, 0] > 0.0001 or u[0, -1] > 0.0001:
-        print("Boundary conditions not fulfilled")
+    u[0, :] = initial_condition(x, a, piecew)
 
     u[1, 1:-1] = u[0, 1:-1] + 0.5 * r * (u[0, 2:] - 2 * u[0, 1:-1] + u[0, :-2])
 
@@ -59,32 +76,186 @@ def solve_vibrating_string(dx, dt, L=1, t=1, c=1, a=5, piecew=False):
     return u
 
 
-def plot_vibrating_string(u, L, t):
-    """Plots the solution of 1D wave equation for a string"""
-    plt.imshow(u, extent=[0, L, t, 0])
-    plt.xlabel("x")
-    plt.ylabel("Time")
-    plt.colorbar(label="Amplitude")
+@njit(cache=True)
+def advance_string(ring, n, r, steps):
+    """Advances the string in place with the leapfrog scheme
+
+    Args:
+        ring (2D array): Ring buffer of three rows, time level m is stored in
+        row m % 3, levels n - 1 and n must be present
+        n (int): Current time level
+        r (float): The constant (c * dt / dx) ** 2
+        steps (int): Number of time steps to take
+    Returns:
+        n (int): The new current time level
+    """
+    nx = ring.shape[1]
+
+    r = ring.dtype.type(r)
+    two = ring.dtype.type(2)
+
+    for m in range(n, n + steps):
+        previous = ring[(m - 1) % 3]
+        current = ring[m % 3]
+        new = ring[(m + 1) % 3]
+        for i in range(1, nx - 1):
+            new[i] = (
+                two * current[i]
+                - previous[i]
+                + r * (current[i + 1] - two * current[i] + current[i - 1])
+            )
+        new[0] = 0
+        new[nx - 1] = 0
 
-    plt.savefig("results/vibrating_string")
+    return n + steps
 
 
-def animate_string(u, x):
-    """Animates the solution of 1D wave equation for a string"""
-    fig, ax = plt.subplots()
-    (line,) = ax.plot([], [])
-    ax.set_xlim(min(x), max(x))
-    ax.set_ylim(np.min(u), np.max(u))
-    ax.set_xlabel("x")
-    ax.set_ylabel("Time")
+def iterate_vibrating_string(
+    dx, dt, L=1, t=1, c=1, a=5, piecew=False, every=1, dtype=np.float64
+):
+    """Solves the wave equation for a 1D string keeping only three time
+    levels in memory, and yields every k-th time level
 
-    def update(frame):
-        line.set_data(x, u[frame, :])
-        return [line]
+    Args:
+        dx, dt, L, t, c, a, piecew, dtype: As in solve_vibrating_string
+        every (int): Only every k-th time level is yielded, starting at 0
+    Yields:
+        n (int): The time level
+        u (1D array): The solution at time level n
+    """
+    r = (c * dt / dx) ** 2
+    nx = int(L / dx + 1)  # number of columns
+    nt = int(t / dt + 1)  # number of rows
+    x = np.linspace(0, L, nx)
 
-    anim = animation.FuncAnimation(
-        fig=fig, func=update, frames=u.shape[0], interval=30, blit=True
+    # Rows 0 and 1 hold the first two time levels
+    ring = np.zeros((3, nx), dtype=dtype)
+    ring[0] = initial_condition(x, a, piecew)
+    ring[1, 1:-1] = ring[0, 1:-1] + 0.5 * r * (
+        ring[0, 2:] - 2 * ring[0, 1:-1] + ring[0, :-2]
     )
 
-    anim.save("results/animate_string.gif")
-    return anim
+    yield 0, ring[0].copy()
+    n = 1
+    for level in range(every, nt, every):
+        n = advance_string(ring, n, r, level - n)
+        yield level, ring[level % 3].copy()
+
+
+def solve_vibrating_string_streaming(
+    dx, dt, L=1, t=1, c=1, a=5, piecew=False, every=1, out=None, dtype=np.float64
+):
+    """Solves the wave equation for a 1D string and stores only every k-th
+    time level, so the memory footprint does not depend on the number of
+    time steps
+
+    Args:
+        dx, dt, L, t, c, a, piecew, dtype: As in solve_vibrating_string
+        every (int): Only every k-th time level is stored, starting at 0
+        out (2D array): Optional output of shape ((nt - 1) // every + 1, nx),
+        for example a np.memmap
+    Returns:
+        u (2D array): The stored time levels of the solution
+    """
+    nx = int(L / dx + 1)  # number of columns
+    nt = int(t / dt + 1)  # number of rows
+    if out is None:
+        out = np.zeros(((nt - 1) // every + 1, nx), dtype=dtype)
+
+    levels = iterate_vibrating_string(dx, dt, L, t, c, a, piecew, every, dtype)
+    for level, u in levels:
+        out[level // every] = u
+
+    return out
+
+
+def solve_vibrating_string_batch(
+    dx, dt, L=1, t=1, c=1, a=5, piecew=False, every=1, dtype=np.float64
+):
+    """Solves the wave equation for an ensemble of 1D strings at once, all
+    strings are advanced together as one 2D array
+
+    Args:
+        dx, dt, L, t, dtype: As in solve_vibrating_string
+        c (float or 1D array): Constant in the wave equation per string
+        a (float or 1D array): Parameter to scale the argument of an IC
+        function per string
+        piecew (boolean or 1D array): Piecewise initial condition per string
+        every (int): Only every k-th time level is stored, starting at 0
+    Returns:
+        u (3D array): The solution with shape (strings, time levels, nx)
+    """
+    c, a, piecew = np.broadcast_arrays(
+        np.atleast_1d(c), np.atleast_1d(a), np.atleast_1d(piecew)
+    )
+
+    # Check the CFL condition for every string
+    courant = c * dt / dx
+    unstable = np.flatnonzero(np.abs(courant) > 1)
+    if len(unstable) > 0:
+        raise ValueError(f"CFL condition not fulfilled for strings {unstable}")
+
+    r = (courant**2)[:, None].astype(dtype)
+    nx = int(L / dx + 1)  # number of columns
+    nt = int(t / dt + 1)  # number of rows
+    x = np.linspace(0, L, nx)
+    u = np.zeros((len(c), (nt - 1) // every + 1, nx), dtype=dtype)
+
+    # ICs
+    previous = initial_condition(x, a, piecew).astype(dtype)
+    current = np.zeros_like(previous)
+    current[:, 1:-1] = previous[:, 1:-1] + 0.5 * r * (
+        previous[:, 2:] - 2 * previous[:, 1:-1] + previous[:, :-2]
+    )
+    u[:, 0] = previous
+    if every == 1 and nt > 1:
+        u[:, 1] = current
+
+    new = np.zeros_like(previous)
+    for n in range(1, nt - 1):
+        new[:, 1:-1] = (
+            2 * current[:, 1:-1]
+            - previous[:, 1:-1]
+            + r * (current[:, 2:] - 2 * current[:, 1:-1] + current[:, :-2])
+        )
+        previous, current, new = current, new, previous
+        if (n + 1) % every == 0:
+            u[:, (n + 1) // every] = current
+
+    return u
+
+
+def solve_vibrating_string_spectral(
+    dx, times, L=1, c=1, a=5, piecew=False, workers=None
+):
+    """Solves the wave equation for a 1D string with fixed ends in the sine
+    basis. The initial condition is transformed once, after which every
+    time is evaluated exactly, without time steps or CFL condition
+
+    Args:
+        dx (float): Step size in x dimension
+        times (1D array): Times at which the solution is returned
+        L, c, a, piecew: As in solve_vibrating_string
+        workers (int): Number of workers for the transforms, -1 uses all
+        cores
+    Returns:
+        u (2D array): The solution with one row per time
+    """
+    nx = int(L / dx + 1)  # number of columns
+    x = np.linspace(0, L, nx)
+    times = np.atleast_1d(times)
+
+    # Sine coefficients of the initial condition on the interior points
+    coefficients = dst(initial_condition(x, a, piecew)[1:-1], type=1)
+
+    # Mode k oscillates with frequency c * k * pi / L
+    frequencies = c * pi * np.arange(1, nx - 1) / L
+    u = np.zeros((len(times), nx))
+    u[:, 1:-1] = idst(
+        coefficients * np.cos(np.outer(times, frequencies)),
+        type=1,
+        axis=-1,
+        workers=workers,
+    )
+
+    return u
@@ -1,7 +1,61 @@
+import json
+import os
+import tempfile
 import unittest
 import numpy as np
-from scientific_computing.time_dep_diff import initialize_grid
-from scientific_computing.add_object_SOR import create_objects
+from scipy.special import erfc
+from scientific_computing.time_dep_diff import (
+    initialize_grid,
+    update_grid,
+    time_dep_diff,
+    time_dep_diff_snapshots,
+    implicit_factorization,
+)
+from scientific_computing.laplace import (
+    sor,
+    sor_red_black,
+    jacobi_iteration,
+    gauss_seidel,
+    optimal_omega,
+    interpolate_grid,
+    sor_mixed_precision,
+    sor_tiled,
+)
+from scientific_computing.add_object_SOR import (
+    create_objects,
+    sor_with_objects,
+    sor_with_objects_red_black,
+    sor_with_objects_runs,
+    calculate_optimal_omega_objects,
+    nested_iteration,
+    optimal_omega_objects,
+    sor_with_objects_mixed_precision,
+    sor_with_objects_tiled,
+)
+from scientific_computing.multigrid import multigrid
+from scientific_computing.vibrating_string import (
+    solve_vibrating_string,
+    solve_vibrating_string_streaming,
+    solve_vibrating_string_batch,
+    solve_vibrating_string_spectral,
+)
+from scientific_computing.analytical import analytical_solution, diffusion_profile
+from scientific_computing.cache import cached
+from scientific_computing.pipeline import stages, dependencies
+from scientific_computing.benchmark import benchmark, compare
+from scientific_computing.sweep import parallel_optimal_omega
+from scientific_computing.sparse_solver import sparse_steady_state, solver_cache
+from scientific_computing.omega_table import (
+    save_table,
+    refresh_table,
+    lookup_omega,
+    object_layout,
+)
+from scientific_computing.monitor import (
+    monitored_jacobi,
+    monitored_sor,
+    monitored_time_dep_diff,
+)
 
 class Test(unittest.TestCase):
     def test_initialize_grid(self):
@@ -16,6 +70,360 @@ class Test(unittest.TestCase):
         actual_grid = create_objects(list_objects, width)
         self.assertTrue(np.array_equal(expected_grid, actual_grid))
 
+    def test_sor_red_black(self):
+        grid, k, delta_list = sor(21, 0.00001, 1.9)
+        grid_rb, k_rb, delta_list_rb = sor_red_black(21, 0.00001, 1.9)
+        self.assertTrue(np.allclose(grid, grid_rb, atol=0.0001))
+        self.assertEqual(k_rb, len(delta_list_rb))
+
+        objects = create_objects(np.array([[3, 8, 4, 10]]), 20)
+        grid = sor_with_objects(20, 0.00001, 1.87, objects)[0]
+        grid_rb = sor_with_objects_red_black(20, 0.00001, 1.87, objects)[0]
+        self.assertTrue(np.allclose(grid, grid_rb, atol=0.0001))
+
+    def test_jacobi_gauss_seidel(self):
+        grid_gs, k_gs, _ = gauss_seidel(20, 0.00001)
+        grid_sor, k_sor, _ = sor(20, 0.00001, 1.0)
+        self.assertTrue(np.array_equal(grid_gs, grid_sor))
+        self.assertEqual(k_gs, k_sor)
+
+        grid_jacobi, k_jacobi, delta_list = jacobi_iteration(20, 0.00001)
+        self.assertTrue(np.allclose(grid_jacobi, grid_gs, atol=0.001))
+        self.assertEqual(k_jacobi, len(delta_list))
+
+    def test_multigrid(self):
+        grid_sor = sor(21, 1e-10, 1.9)[0]
+        grid_mg, k, delta_list = multigrid(21, 1e-10)
+        self.assertTrue(np.allclose(grid_sor, grid_mg, atol=1e-8))
+        self.assertEqual(k, len(delta_list))
+
+        objects = create_objects(np.array([[3, 8, 4, 10], [12, 14, 2, 18]]), 30)
+        grid_sor = sor_with_objects(30, 1e-10, 1.9, objects)[0]
+        grid_mg = multigrid(30, 1e-10, objects)[0]
+        self.assertTrue(np.allclose(grid_sor, grid_mg, atol=1e-8))
+
+    def test_golden_section_omega(self):
+        # The same omega as the grid search for the sizes of the scripts
+        objects = np.array([[3, 8, 4, 10]])
+        for N in range(20, 81, 10):
+            self.assertEqual(
+                optimal_omega(N, 0.00001), optimal_omega(N, 0.00001, "golden")
+            )
+            grid = create_objects(objects, N)
+            self.assertEqual(
+                optimal_omega_objects(N, 0.00001, grid),
+                optimal_omega_objects(N, 0.00001, grid, "golden"),
+            )
+
+    def test_parallel_optimal_omega(self):
+        list_objects = np.array([[2, 4, 2, 4]], dtype=np.int64)
+        list_N = np.array([8, 10], dtype=np.int64)
+        expected = calculate_optimal_omega_objects(0.00001, list_objects, list_N)
+        actual = parallel_optimal_omega(0.00001, list_N, [list_objects], processes=2)
+        self.assertTrue(np.allclose(expected, actual[0]))
+
+    def test_sparse_steady_state(self):
+        objects = create_objects(np.array([[3, 8, 4, 10]]), 20)
+        grid_sor = sor_with_objects(20, 1e-12, 1.87, objects)[0]
+        for method in ("direct", "cg"):
+            grid = sparse_steady_state(20, 1e-12, objects, method)[0]
+            self.assertTrue(np.allclose(grid_sor, grid, atol=1e-9))
+
+        # A second solve with other boundary values reuses the factorization
+        cached = len(solver_cache)
+        grid = sparse_steady_state(20, objects=objects, top=2.0)[0]
+        self.assertEqual(cached, len(solver_cache))
+        self.assertTrue(np.allclose(2 * grid_sor, grid))
+
+        # Not converging is an error, not a silent result
+        with self.assertRaises(RuntimeError):
+            sparse_steady_state(20, 1e-12, objects, "cg", max_iter=1)
+
+    def test_sor_with_objects_runs(self):
+        list_objects = np.array([[7, 12, 15, 21], [4, 5, 0, 8], [10, 12, 0, 3]])
+        objects = create_objects(list_objects, 21)
+        grid, k, delta_list = sor_with_objects(21, 0.00001, 1.8, objects)
+        grid_runs, k_runs, delta_list_runs = sor_with_objects_runs(
+            21, 0.00001, 1.8, objects
+        )
+        self.assertTrue(np.array_equal(grid, grid_runs))
+        self.assertEqual(k, k_runs)
+        self.assertTrue(np.array_equal(delta_list, delta_list_runs))
+
+    def test_time_dep_diff(self):
+        grid = initialize_grid(11)
+        for step in range(100):
+            grid = update_grid(11, 0.001, grid, 1)
+        self.assertTrue(np.allclose(grid, time_dep_diff(11, 1, 0.001, 0.1)))
+
+        times = [0, 0.01, 0.05]
+        snapshots = time_dep_diff_snapshots(11, 1, 0.001, times)
+        for time, snapshot in zip(times, snapshots):
+            self.assertTrue(np.array_equal(time_dep_diff(11, 1, 0.001, time), snapshot))
+
+    def test_time_dep_diff_implicit(self):
+        grid = time_dep_diff(20, 1, 0.0001, 0.1)
+        for scheme in ("backward-euler", "crank-nicolson"):
+            grid_implicit = time_dep_diff(20, 1, 0.001, 0.1, scheme=scheme)
+            self.assertTrue(np.allclose(grid, grid_implicit, atol=0.002))
+
+        # Unstable for the explicit scheme, the factorization is reused
+        with self.assertRaises(ValueError):
+            time_dep_diff(20, 1, 0.01, 1)
+        time_dep_diff(20, 1, 0.01, 1, scheme="backward-euler")
+        hits = implicit_factorization.cache_info().hits
+        grid = time_dep_diff(20, 1, 0.01, 1, scheme="backward-euler")
+        self.assertEqual(implicit_factorization.cache_info().hits, hits + 1)
+        self.assertTrue(np.allclose(grid[:, 0], np.linspace(0, 1, 20), atol=0.001))
+
+    def test_analytical_solution(self):
+        # Full series of the original implementation
+        y = np.linspace(0, 1, 50)
+        i_values = np.arange(10001)
+        expected = np.sum(
+            erfc((1 - y[:, None] + 2 * i_values) / 2)
+            - erfc((1 + y[:, None] + 2 * i_values) / 2),
+            axis=1,
+        )
+        self.assertTrue(np.allclose(expected, analytical_solution(1, 1), atol=1e-15))
+        self.assertTrue(np.allclose(expected[::7], diffusion_profile(1, 1, y[::7])))
+
+        # Cached results are copied
+        solution = analytical_solution(1, 1)
+        solution[:] = 0
+        self.assertTrue(np.allclose(expected, analytical_solution(1, 1)))
+
+    def test_vibrating_string_streaming(self):
+        u = solve_vibrating_string(0.01, 0.01, a=5, piecew=True)
+        u_streaming = solve_vibrating_string_streaming(
+            0.01, 0.01, a=5, piecew=True, every=7
+        )
+        self.assertTrue(np.array_equal(u[::7], u_streaming))
+
+    def test_vibrating_string_batch(self):
+        c = [1, 0.5, 0.9]
+        a = [5, 5, 2]
+        piecew = [True, False, False]
+        u = solve_vibrating_string_batch(0.01, 0.01, c=c, a=a, piecew=piecew)
+        for m in range(3):
+            expected = solve_vibrating_string(0.01, 0.01, c=c[m], a=a[m], piecew=piecew[m])
+            self.assertTrue(np.allclose(expected, u[m], atol=1e-12))
+
+        with self.assertRaises(ValueError):
+            solve_vibrating_string_batch(0.01, 0.01, c=[1, 1.5])
+
+    def test_vibrating_string_spectral(self):
+        x = np.linspace(0, 1, 101)
+        times = np.array([0, 0.13, 0.5, 1000.37])
+        u = solve_vibrating_string_spectral(0.01, times, c=1.3, a=3)
+        expected = np.sin(3 * np.pi * x) * np.cos(3 * np.pi * 1.3 * times[:, None])
+        self.assertTrue(np.allclose(expected, u, atol=1e-12))
+
+        # With dt = dx the leapfrog scheme is exact for a sine
+        u_fd = solve_vibrating_string(0.01, 0.01, c=1, a=2)
+        u = solve_vibrating_string_spectral(0.01, [0.37, 1], a=2)
+        self.assertTrue(np.allclose(u_fd[[37, 100]], u, atol=1e-10))
+
+    def test_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cached_sor = cached(sor_with_objects, directory)
+            objects = create_objects(np.array([[3, 8, 4, 10]]), 20)
+            grid, k, delta_list = cached_sor(20, 0.00001, 1.8, objects)
+            cached_grid, cached_k, cached_delta_list = cached_sor(
+                20, 0.00001, 1.8, objects
+            )
+            self.assertTrue(np.array_equal(grid, cached_grid))
+            self.assertEqual(k, cached_k)
+            self.assertTrue(np.array_equal(delta_list, cached_delta_list))
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+            # Keyword and default arguments give the same entry
+            cached_sor(20, 0.00001, omega=1.8, objects=objects, max_iter=10000)
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+            # A different object mask is a different entry
+            objects = create_objects(np.array([[3, 9, 4, 10]]), 20)
+            cached_sor(20, 0.00001, 1.8, objects)
+            self.assertEqual(len(os.listdir(directory)), 2)
+
+            # The dtype is part of the key
+            cached_sor(20, 0.00001, 1.8, objects, dtype=np.float32)
+            self.assertEqual(len(os.listdir(directory)), 3)
+
+            # Old entries are removed when the cache is full
+            cached_string = cached(solve_vibrating_string, directory, 100000)
+            cached_string(0.01, 0.01)
+            cached_string(0.01, 0.01, a=2)
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_pipeline_dependencies(self):
+        stage_dependencies = dependencies(stages)
+        self.assertEqual(stage_dependencies["calculate_laplace"], set())
+        self.assertEqual(stage_dependencies["visualize_Laplace"], {"calculate_laplace"})
+        self.assertEqual(stage_dependencies["visualize_objects"], {"objects_omega"})
+
+    def test_benchmark_compare(self):
+        report = benchmark(["sor"], [20], repeats=1)
+        self.assertEqual(report["results"][0]["iterations"], sor(20, 0.00001, 2 / (1 + np.sin(np.pi / 20)))[1])
+        self.assertEqual(compare(report, report), [])
+
+        # Half the throughput and more iterations are both regressions
+        slower = json.loads(json.dumps(report))
+        slower["results"][0]["cell_updates_per_second"] /= 2
+        slower["results"][0]["iterations"] += 1
+        self.assertEqual(len(compare(slower, report)), 2)
+
+    def test_monitored_solvers(self):
+        grid, k, delta_list = jacobi_iteration(20, 0.00001)
+        monitored = monitored_jacobi(20, 0.00001, every=50)
+        self.assertTrue(np.array_equal(monitored[0], grid))
+        self.assertTrue(np.array_equal(monitored[2], delta_list))
+        self.assertEqual(len(monitored[3]["checkpoints"]), -(-k // 50))
+
+        objects = create_objects(np.array([[5, 10, 5, 10]]), 20)
+        grid, k, delta_list = sor_with_objects(20, 0.00001, 1.8, objects)
+        monitored = monitored_sor(20, 0.00001, 1.8, objects, every=7)
+        self.assertTrue(np.array_equal(monitored[0], grid))
+        self.assertEqual(monitored[3]["checkpoints"][-1][0], k)
+
+        # The callback can stop the run after a chunk
+        monitored = monitored_sor(20, 0.00001, 1.8, every=10, callback=lambda *c: True)
+        self.assertEqual(monitored[1], 10)
+
+        for scheme in ["explicit", "crank-nicolson"]:
+            grid = time_dep_diff(20, 1, 0.0001, 0.05, scheme=scheme)
+            monitored = monitored_time_dep_diff(20, 1, 0.0001, 0.05, 64, scheme=scheme)
+            self.assertTrue(np.allclose(monitored[0], grid, atol=1e-14))
+            self.assertEqual(monitored[1]["steps"], int(0.05 / 0.0001))
+
+    def test_nested_iteration(self):
+        grid = np.random.rand(7, 7)
+        self.assertTrue(np.allclose(interpolate_grid(grid, 7), grid))
+
+        # Without objects the solution is linear in y, so the interpolated
+        # coarse solution is already converged on the finer grid
+        results = nested_iteration(0.000001, [50, 25])
+        self.assertEqual(results[1][1], sor(25, 0.000001, 2 / (1 + np.sin(np.pi / 25)))[1])
+        self.assertEqual(results[0][1], 1)
+
+        list_objects = np.array([[5, 10, 5, 10]])
+        omega = 2 / (1 + np.sin(np.pi / 50))
+        grid, k, delta_list = sor_with_objects(
+            50, 0.000001, omega, create_objects(list_objects, 50)
+        )
+        nested_grid, nested_k = nested_iteration(
+            0.000001, [25, 50], list_objects=list_objects
+        )[1]
+        self.assertLess(nested_k, k)
+        self.assertTrue(np.allclose(nested_grid, grid, atol=0.0001))
+
+    def test_adaptive_omega(self):
+        for N in [25, 50]:
+            grid, k, delta_list, omega = sor(N, 0.00001, "auto")
+            expected = sor(N, 0.00001, 2 / (1 + np.sin(np.pi / N)))
+            self.assertTrue(1.8 < omega < 2)
+            self.assertLessEqual(k, expected[1])
+            exact = np.outer(np.linspace(0, 1, N), np.ones(N))
+            self.assertTrue(np.allclose(grid, exact, atol=0.001))
+
+        # Close to the optimum with objects, noisy rates must not derail it
+        list_objects = np.array([[3, 8, 4, 10], [12, 14, 2, 18]])
+        for N in range(70, 91, 5):
+            objects = create_objects(list_objects, N)
+            grid, k, delta_list, omega = sor_with_objects(N, 0.00001, "auto", objects)
+            golden = optimal_omega_objects(N, 0.00001, objects, "golden")
+            expected = sor_with_objects(N, 0.00001, golden, objects)
+            self.assertLessEqual(k, 1.15 * expected[1])
+            self.assertTrue(np.allclose(grid, expected[0], atol=0.001))
+            self.assertTrue(np.all(grid[1:-1][objects[1:-1] == 1] == 0))
+
+    def test_omega_table(self):
+        list_objects = object_layout(40, 0.2, 4)
+        objects = create_objects(list_objects, 40)
+        self.assertEqual(np.sum(objects[1:-1]), 4 * 9**2)
+
+        # The objects cover the fraction, or the layout is rejected
+        for fraction in [0.05, 0.2, 0.3, 0.5]:
+            for count in [1, 2, 4, 9]:
+                objects = create_objects(object_layout(100, fraction, count), 100)
+                covered = np.sum(objects[1:-1]) / 100**2
+                self.assertAlmostEqual(covered, fraction, delta=0.02)
+        with self.assertRaises(ValueError):
+            object_layout(50, 0.6, 2)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "omega_table.json")
+            entries = [
+                {"N": N, "fraction": f, "count": 1, "omega": omega}
+                for N, f, omega in [(20, 0.0, 1.7), (40, 0.0, 1.9), (20, 0.2, 1.6)]
+            ]
+            save_table({"version": 1, "eps": 0.00001, "entries": entries}, path)
+
+            # Linear in 1 / N and in the fraction, constant outside the table
+            self.assertAlmostEqual(lookup_omega(30, 0.0, 1, path), 1.7 + 0.2 / 3 * 2)
+            self.assertAlmostEqual(lookup_omega(40, 0.1, 2, path), 1.75)
+            self.assertAlmostEqual(lookup_omega(80, 0.0, 1, path), 1.9)
+
+            # Only the missing entry is computed, once for all counts since
+            # fraction 0 means no objects
+            table, added = refresh_table(
+                [20, 30], [0.0], [1, 2, 4], 0.00001, path, 1
+            )
+            self.assertEqual(added, 1)
+            self.assertEqual(table["entries"][:3], entries)
+            self.assertEqual(table["entries"][3]["count"], 0)
+            self.assertAlmostEqual(
+                lookup_omega(30, 0.0, 1, path), optimal_omega(30, 0.00001, "golden")
+            )
+            self.assertAlmostEqual(
+                lookup_omega(30, 0.0, 0, path), lookup_omega(30, 0.0, 4, path)
+            )
+
+    def test_float32(self):
+        omega = 2 / (1 + np.sin(np.pi / 30))
+        grid = sor(30, 0.00001, omega, dtype=np.float32)[0]
+        self.assertEqual(grid.dtype, np.float32)
+        self.assertTrue(np.allclose(grid, sor(30, 0.00001, omega)[0], atol=0.001))
+
+        grid = time_dep_diff(20, 1, 0.0001, 0.05, dtype=np.float32)
+        self.assertEqual(grid.dtype, np.float32)
+        self.assertTrue(np.allclose(grid, time_dep_diff(20, 1, 0.0001, 0.05), atol=1e-5))
+
+        u = solve_vibrating_string(0.01, 0.01, dtype=np.float32)
+        self.assertEqual(u.dtype, np.float32)
+        self.assertTrue(np.allclose(u, solve_vibrating_string(0.01, 0.01), atol=1e-5))
+
+        # Iterative refinement reaches tolerances float32 cannot, in about
+        # as many (float32) sweeps as float64
+        expected = sor(100, 1e-11, 2 / (1 + np.sin(np.pi / 100)))
+        grid, k, delta_list = sor_mixed_precision(
+            100, 1e-11, 2 / (1 + np.sin(np.pi / 100))
+        )
+        self.assertEqual(grid.dtype, np.float64)
+        self.assertLess(delta_list[-1], 1e-11)
+        self.assertLessEqual(k, 1.02 * expected[1])
+        self.assertTrue(np.allclose(grid, expected[0], atol=1e-10))
+
+        objects = create_objects(np.array([[5, 10, 5, 10]]), 30)
+        grid, k, delta_list = sor_with_objects_mixed_precision(30, 1e-10, 1.8, objects)
+        expected = sor_with_objects(30, 1e-10, 1.8, objects)[0]
+        self.assertTrue(np.allclose(grid, expected, atol=1e-9))
+        self.assertTrue(np.all(grid[1:-1][objects[1:-1] == 1] == 0))
+
+    def test_sor_tiled(self):
+        # A pass of several sweeps gives exactly the same sweeps as sor
+        for sweeps in [1, 3, 8]:
+            grid, k, delta_list = sor(31, 0, 1.9, max_iter=40)
+            tiled = sor_tiled(31, 0, 1.9, sweeps, max_iter=40)
+            self.assertTrue(np.array_equal(tiled[0], grid))
+            self.assertTrue(np.array_equal(tiled[2], delta_list))
+
+        objects = create_objects(np.array([[3, 8, 2, 9], [10, 15, 12, 18]]), 31)
+        grid, k, delta_list = sor_with_objects(31, 0.00001, 1.9, objects)
+        tiled = sor_with_objects_tiled(31, 0.00001, 1.9, objects, 5)
+        self.assertTrue(k <= tiled[1] < k + 5)
+        self.assertTrue(np.array_equal(tiled[2][:k], delta_list))
+
 
 if __name__ == "__main__":
     unittest.main()